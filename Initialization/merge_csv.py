@@ -1,145 +1,619 @@
 import pandas as pd
+import numpy as np
 import os
 import glob
+import csv
+import io
+import re
+import heapq
+import pickle
+import shutil
+import tempfile
+import zlib
+import json
+import hashlib
+import argparse
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+from csv_cache import read_csv_cached, file_hash
+from csv_schema import read_typed_csv, read_header, sniff_delimiter, schema_for, coerce_column
+
+# Streaming mode defaults (see run_streaming_merge)
+STREAM_PARTITIONS = 64
+STREAM_CHUNKSIZE = 50000
+SEQ_COL = '__seq'
 
 def load_csv(path):
     if not os.path.exists(path):
         print(f"⚠️ Warning: File not found: {path}")
         return None
     try:
-        # Try pipe delimiter first as it's our standard now
-        df = pd.read_csv(path, sep='|', low_memory=False)
-        # Check if it looks parsed correctly (more than 1 column)
-        if len(df.columns) < 2:
-            # Fallback to comma if pipe failed to split
-            df = pd.read_csv(path, sep=',', low_memory=False)
-        return df
+        # Delimiter sniffed from the header, known columns parsed straight
+        # into their declared dtypes (scripts/csv_schema.py), parsed frames
+        # cached (scripts/csv_cache.py)
+        return read_typed_csv(path, reader=read_csv_cached)
     except Exception as e:
         print(f"❌ Error loading {path}: {e}")
         return None
 
+def load_csvs(paths, workers=None):
+    # Parse files in a process pool; results come back in input order so
+    # the concat (and keep='last') is the same as a serial load.
+    if workers == 1 or len(paths) < 2:
+        return [load_csv(p) for p in paths]
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(load_csv, paths))
+
 def normalize_title(t):
     if pd.isna(t): return ""
     return str(t).lower().strip()
 
-def run_merge():
+# === MERGE STEPS (shared by the in-memory and streaming paths) ===
+def dedupe_base(df_main):
+    # Drop pure duplicates first, then keep the last row per ID
+    # (later files in the concat are newer). SEQ_COL is bookkeeping
+    # for the streaming path and must not make rows look distinct.
+    if 'id' not in df_main.columns:
+        return df_main
+    content_cols = [c for c in df_main.columns if c != SEQ_COL]
+    df_main = df_main.drop_duplicates(subset=content_cols)
+    df_main = df_main.drop_duplicates(subset=['id'], keep='last')
+    # Also ensure 'id' is not null/empty
+    return df_main[df_main['id'].notna() & (df_main['id'] != '')]
+
+def dedupe_source(df):
+    if 'id' in df.columns:
+        df = df.drop_duplicates(subset=['id'], keep='last')
+        df = df[df['id'].notna() & (df['id'] != '')]
+    return df
+
+# === FIELD PRECEDENCE ===
+# For every column, the first source in its precedence list that has a
+# value wins. Adding a source or changing who owns a field is a config
+# change here, not another full-frame pass.
+SOURCES = ('base', 'enrich', 'oc')  # also the row order of the output
+DEFAULT_PRECEDENCE = ('enrich', 'base', 'oc')
+FIELD_PRECEDENCE = {
+    # OpenCritic is the reference for its own score
+    'opencriticScore': ('oc', 'enrich', 'base'),
+}
+
+def ordered_union(indexes):
+    # Union keeping first-appearance order (base rows, then new ids/columns
+    # from each later source)
+    result = indexes[0]
+    for idx in indexes[1:]:
+        result = result.append(idx[~idx.isin(result)])
+    return result
+
+def align_dtypes(a, b):
+    # where() on nullable/categorical columns needs both sides on one dtype:
+    # the same categories, or Float64 when an Int64 column meets a Float64 one
+    if isinstance(a.dtype, pd.CategoricalDtype) or isinstance(b.dtype, pd.CategoricalDtype):
+        cats = pd.concat([a.dropna().drop_duplicates(), b.dropna().drop_duplicates()]).astype(str).unique()
+        dtype = pd.CategoricalDtype(pd.Index(cats))
+        return a.astype(dtype), b.astype(dtype)
+    if a.dtype != b.dtype and (isinstance(a.dtype, pd.api.extensions.ExtensionDtype) or isinstance(b.dtype, pd.api.extensions.ExtensionDtype)):
+        dtype = common_dtype([a.dtype, b.dtype])
+        return a.astype(dtype), b.astype(dtype)
+    return a, b
+
+def resolve_precedence(frames, precedence=None):
+    """frames: {source: frame deduplicated by id}. Returns one row per id
+    with every column resolved from its precedence list in a single pass:
+    each source is reindexed once, then each column is a chain of
+    where(notna) fills."""
+    precedence = {**FIELD_PRECEDENCE, **(precedence or {})}
+    present = [(src, frames[src].set_index('id')) for src in SOURCES if frames.get(src) is not None]
+    ids = ordered_union([df.index for _, df in present])
+    columns = ordered_union([df.columns for _, df in present])
+    aligned = {src: df.reindex(ids) for src, df in present}
+
+    resolved = {}
+    for col in columns:
+        value = None
+        for src in precedence.get(col, DEFAULT_PRECEDENCE):
+            if src not in aligned or col not in aligned[src].columns:
+                continue
+            candidate = aligned[src][col]
+            if value is None:
+                value = candidate
+            else:
+                value, candidate = align_dtypes(value, candidate)
+                value = value.where(value.notna(), candidate)
+        resolved[col] = value
+    return pd.DataFrame(resolved, index=ids).rename_axis('id').reset_index()
+
+def source_paths(base_dir):
+    # Base files (merged_games + games_20XX), then enrich, then OpenCritic
+    base_paths = [os.path.join(base_dir, 'merged_games.csv')]
+    # Sorted so later years come last and win the keep='last' dedupe
+    base_paths += sorted(glob.glob(os.path.join(base_dir, 'games_20*.csv')))
+    enrich_path = os.path.join(base_dir, 'enrich_results.csv')
+    oc_path = os.path.join(base_dir, 'opencritic_sync-score.csv')
+    return base_paths, enrich_path, oc_path
+
+def merge_sources(base_frames, df_enrich, df_oc, verbose=True):
+    log = print if verbose else (lambda *a, **k: None)
+
+    # Concat Base
+    df_main = pd.concat(base_frames, ignore_index=True)
+    log(f"   Base Total Rows: {len(df_main)}")
+
+    # Deduplicate Base by ID (relying on ID is safer than Title)
+    df_main = dedupe_base(df_main)
+    log(f"   After Deduplication: {len(df_main)}")
+
+    if df_enrich is not None:
+        log(f"   Enriched Rows: {len(df_enrich)}")
+        df_enrich = dedupe_source(df_enrich)
+    if df_oc is not None:
+        log(f"   OpenCritic Rows: {len(df_oc)}")
+        df_oc = dedupe_source(df_oc)
+
+    # Resolve every column by its source precedence (see FIELD_PRECEDENCE)
+    log("   Resolving fields by source precedence...")
+    df_main = resolve_precedence({'base': df_main, 'enrich': df_enrich, 'oc': df_oc})
+    log(f"   Merged Rows: {len(df_main)}")
+
+    return df_main
+
+def run_merge(streaming=False, incremental=False, partitions=STREAM_PARTITIONS, chunksize=STREAM_CHUNKSIZE, workers=None):
     print("🔄 Starting CSV Merge Process...")
-    
+
     # Paths
     base_dir = os.path.join(os.getcwd(), 'scripts', 'csv')
     out_path = os.path.join(base_dir, 'merged_all_games.csv')
-    
-    # 1. Load Base Files (merged_games + games_20XX)
-    print("📂 Loading Base Files...")
-    base_frames = []
-    
-    # merged_games.csv
-    df_merged = load_csv(os.path.join(base_dir, 'merged_games.csv'))
-    if df_merged is not None: base_frames.append(df_merged)
-    
-    # games_20XX.csv
-    year_files = glob.glob(os.path.join(base_dir, 'games_20*.csv'))
-    for f in year_files:
-        print(f"   Found Year File: {os.path.basename(f)}")
-        df_y = load_csv(f)
-        if df_y is not None: base_frames.append(df_y)
-        
-    if not base_frames:
+    base_paths, enrich_path, oc_path = source_paths(base_dir)
+
+    if streaming:
+        run_streaming_merge(base_paths, enrich_path, oc_path, out_path,
+                            partitions=partitions, chunksize=chunksize)
+        return
+
+    if incremental and run_incremental_merge(base_dir, out_path, workers):
+        return
+
+    # 1. Load Base Files (merged_games + games_20XX), Enrich Results and
+    #    OpenCritic Sync in one pool
+    print("📂 Loading Base, Enrichment & OpenCritic Files...")
+    for f in base_paths:
+        if os.path.basename(f) != 'merged_games.csv':
+            print(f"   Found Year File: {os.path.basename(f)}")
+    frames = load_csvs(base_paths + [enrich_path, oc_path], workers)
+    df_enrich, df_oc = frames[-2], frames[-1]
+
+    loaded = [('base', f, df) for f, df in zip(base_paths, frames[:-2]) if df is not None]
+    if not loaded:
         print("❌ No base files found. Exiting.")
         return
+    if df_enrich is not None: loaded.append(('enrich', enrich_path, df_enrich))
+    if df_oc is not None: loaded.append(('oc', oc_path, df_oc))
 
-    # Concat Base
-    df_main = pd.concat(base_frames, ignore_index=True)
-    print(f"   Base Total Rows: {len(df_main)}")
-    
-    # Deduplicate Base by ID (prefer last?) or Title?
-    # Usually ID is safest if valid, else Title.
-    # Let's deduplicate by 'id' first if present.
-    if 'id' in df_main.columns:
-        # Sort by title/releaseDate to have some determinism on 'last'?
-        # Actually, let's just drop pure duplicates first
-        df_main = df_main.drop_duplicates()
-        # Then by ID, keeping last (assuming later files in concat are newer)
-        df_main = df_main.drop_duplicates(subset=['id'], keep='last')
-        # Also ensure 'id' is string and not null/empty
-        df_main = df_main[df_main['id'].notna() & (df_main['id'] != '')]
-    
-    # Check for title duplicates if IDs are missing?
-    # For now relying on ID is safer.
-    print(f"   After Deduplication: {len(df_main)}")
-
-    # 2. Load Enrich Results (Priority 1 for Metadata)
-    print("📂 Loading Enrichment Data...")
-    df_enrich = load_csv(os.path.join(base_dir, 'enrich_results.csv'))
-    
-    if df_enrich is not None:
-        print(f"   Enriched Rows: {len(df_enrich)}")
-        # Deduplicate Enrich by ID too!
-        if 'id' in df_enrich.columns:
-            df_enrich = df_enrich.drop_duplicates(subset=['id'], keep='last')
-            df_enrich = df_enrich[df_enrich['id'].notna() & (df_enrich['id'] != '')]
-        
-        # Update main with enrich
-        # Set indexes for update
-        df_main.set_index('id', inplace=True)
-        df_enrich.set_index('id', inplace=True)
-        
-        # update() in pandas overwrites matching index/columns with new values
-        df_main.update(df_enrich)
-        
-        # Add new rows from enrich
-        # Use simple filter based on index
-        new_ids = df_enrich.index.difference(df_main.index)
-        if len(new_ids) > 0:
-            print(f"   Adding {len(new_ids)} new games from enrichment...")
-            # concat needs matching columns/structure largely, but pandas handles mismatch by filling NaN
-            df_main = pd.concat([df_main, df_enrich.loc[new_ids]])
-            
-        df_main.reset_index(inplace=True)
-        # df_enrich reset not needed if we are done with it
-
-    # 3. Load OpenCritic Sync (Priority 1 for Scores, Priority 2 for missing data)
-    print("📂 Loading OpenCritic Data...")
-    df_oc = load_csv(os.path.join(base_dir, 'opencritic_sync-score.csv'))
-    
-    if df_oc is not None:
-        print(f"   OpenCritic Rows: {len(df_oc)}")
-        
-        if 'id' in df_oc.columns:
-             df_oc = df_oc.drop_duplicates(subset=['id'], keep='last')
-             df_oc = df_oc[df_oc['id'].notna() & (df_oc['id'] != '')]
-        
-        df_main.set_index('id', inplace=True)
-        df_oc.set_index('id', inplace=True)
-        
-        # A. Override Scores
-        if 'opencriticScore' in df_oc.columns:
-            # We explicitly want OC Score from here
-            # update() will do it.
-            print("   Updating Scores from OpenCritic...")
-            # Only update intersecting rows
-            common_ids = df_main.index.intersection(df_oc.index)
-            if len(common_ids) > 0:
-                 df_main.loc[common_ids, 'opencriticScore'] = df_oc.loc[common_ids, 'opencriticScore']
-            
-        # B. Update other fields only if missing in Main (fill gaps)
-        # combine_first(df_oc): Keeps main, fills from OC.
-        print("   Filling missing data from OpenCritic...")
-        df_main = df_main.combine_first(df_oc)
-        
-        df_main.reset_index(inplace=True)
-
-    # 4. Final Cleanup & Export
+    df_main = merge_sources([df for role, _, df in loaded if role == 'base'], df_enrich, df_oc)
+
+    # 2. Final Cleanup & Export
     print("💾 Saving merged file...")
-    # Ensure ID is first
-    cols = list(df_main.columns)
-    if 'id' in cols:
-        cols.insert(0, cols.pop(cols.index('id')))
-        df_main = df_main[cols]
-        
     df_main.to_csv(out_path, sep='|', index=False)
+    write_manifest(base_dir, out_path, loaded)
     print(f"✅ Success! Saved {len(df_main)} games to:")
     print(f"   {out_path}")
 
+# === INCREMENTAL MERGE ===
+# A manifest next to the output records, per source, its stat/SHA-1, header
+# and a content hash per id. A rerun with --incremental only re-resolves the
+# ids whose rows changed in a modified source, through the same merge steps,
+# and patches them into the existing merged file.
+
+MANIFEST_NAME = '.merge_manifest.json'
+MANIFEST_VERSION = 2
+
+def id_key(v):
+    # 184 and 184.0 (ids read back from a file with gaps) are the same game
+    if isinstance(v, (float, np.floating)) and float(v).is_integer():
+        return str(int(v))
+    return str(v)
+
+def row_hashes(df):
+    """Returns {id: content hash} for one source, over the rows sharing each
+    id in file order. Numbers are hashed as floats so a column flipping
+    between int and float inference does not mark every row as changed."""
+    if 'id' not in df.columns:
+        return {}
+    df = df[df['id'].notna() & (df['id'] != '')]
+    canon = {}
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+            canon[col] = s.astype('float64')
+        else:
+            canon[col] = s.astype(str).where(s.notna(), '')
+    hashes = pd.util.hash_pandas_object(pd.DataFrame(canon, index=df.index), index=False).to_numpy()
+    keys = df['id'].map(id_key).to_numpy()
+
+    dup = pd.Series(keys).duplicated(keep=False).to_numpy()
+    result = {k: format(h, '016x') for k, h in zip(keys[~dup], hashes[~dup])}
+    if dup.any():
+        for k, group in pd.Series(hashes[dup]).groupby(keys[dup], sort=False):
+            result[k] = hashlib.sha1(group.to_numpy().tobytes()).hexdigest()[:16]
+    return result
+
+def manifest_path(base_dir):
+    return os.path.join(base_dir, MANIFEST_NAME)
+
+def source_stat(path):
+    st = os.stat(path)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha1': file_hash(path)}
+
+def write_manifest(base_dir, out_path, loaded, previous=None):
+    """loaded: [(role, path, frame or None)]. A None frame means the source
+    is unchanged and its entry is carried over from the previous manifest."""
+    carried = {s['name']: s for s in previous['sources']} if previous else {}
+    sources, rows = [], {}
+    for role, path, df in loaded:
+        name = os.path.basename(path)
+        columns = list(df.columns) if df is not None else carried[name]['columns']
+        sources.append({'name': name, 'role': role, 'columns': columns, **source_stat(path)})
+        rows[name] = row_hashes(df) if df is not None else previous['rows'][name]
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'output': source_stat(out_path),
+        'sources': sources,
+        'rows': rows,
+    }
+    tmp = manifest_path(base_dir) + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp, manifest_path(base_dir))
+
+def read_manifest(base_dir):
+    try:
+        with open(manifest_path(base_dir), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('version') == MANIFEST_VERSION else None
+
+def header_of(path):
+    return read_header(path)
+
+def output_order(base_frames, df_enrich, df_oc):
+    # id_key of every output row, in merge_sources order: base ids (deduped
+    # as dedupe_base does), then new enrich ids, then new OpenCritic ids
+    ids = [dedupe_base(pd.concat(base_frames, ignore_index=True))['id']]
+    ids += [dedupe_source(df)['id'] for df in (df_enrich, df_oc) if df is not None]
+    return ordered_union([pd.Index(s.map(id_key)).unique() for s in ids])
+
+def run_incremental_merge(base_dir, out_path, workers=None):
+    """Patches out_path in place. Returns False when a full rebuild is needed."""
+    print("⚡ Incremental merge: checking sources against manifest...")
+    manifest = read_manifest(base_dir)
+    base_paths, enrich_path, oc_path = source_paths(base_dir)
+    current = [('base', p) for p in base_paths if os.path.exists(p)]
+    current += [(role, p) for role, p in (('enrich', enrich_path), ('oc', oc_path)) if os.path.exists(p)]
+
+    # Anything that changes columns or precedence order needs a full rebuild
+    reason = None
+    if manifest is None:
+        reason = "no manifest"
+    elif not os.path.exists(out_path) or source_stat(out_path)['sha1'] != manifest['output']['sha1']:
+        reason = "merged file missing or edited"
+    else:
+        old = [(s['role'], s['name']) for s in manifest['sources']]
+        new = [(role, os.path.basename(p)) for role, p in current]
+        if [s for s in old if s in new] != [s for s in new if s in old]:
+            reason = "source order changed"
+        elif any(s[0] != 'base' for s in set(old) ^ set(new)):
+            reason = "enrich/OpenCritic source added or removed"
+    if reason is None:
+        previous = {s['name']: s for s in manifest['sources']}
+        for role, p in current:
+            prev = previous.get(os.path.basename(p))
+            if prev is not None and header_of(p) != prev['columns']:
+                reason = f"header changed in {os.path.basename(p)}"
+                break
+    if reason is not None:
+        print(f"   Full rebuild required ({reason}).")
+        return False
+
+    previous = {s['name']: s for s in manifest['sources']}
+    current_names = {os.path.basename(p) for _, p in current}
+    changed = [(role, p) for role, p in current
+               if os.path.basename(p) not in previous or source_stat(p)['sha1'] != previous[os.path.basename(p)]['sha1']]
+    removed = [name for name in previous if name not in current_names]
+    if not changed and not removed:
+        print("✅ Up to date, nothing to merge.")
+        return True
+
+    # Delta: ids whose rows changed in any modified/added/removed source
+    paths = [p for _, p in current]
+    frames = dict(zip(paths, load_csvs(paths, workers)))
+    if any(df is None for df in frames.values()):
+        print("   Full rebuild required (a source failed to load).")
+        return False
+    delta = set()
+    for role, p in changed:
+        name = os.path.basename(p)
+        print(f"   Changed: {name}")
+        old_ids = manifest['rows'].get(name, {})
+        new_ids = row_hashes(frames[p])
+        delta.update(k for k in old_ids.keys() | new_ids.keys() if old_ids.get(k) != new_ids.get(k))
+    for name in removed:
+        print(f"   Removed: {name}")
+        delta.update(manifest['rows'][name].keys())
+    print(f"   Ids to re-resolve: {len(delta)}")
+
+    def only_delta(df):
+        return df[df['id'].map(id_key).isin(delta)] if df is not None and 'id' in df.columns else df
+
+    base_frames = [only_delta(frames[p]) for role, p in current if role == 'base']
+    df_enrich = only_delta(frames.get(enrich_path))
+    df_oc = only_delta(frames.get(oc_path))
+    if df_enrich is not None and len(df_enrich) == 0: df_enrich = None
+    if df_oc is not None and len(df_oc) == 0: df_oc = None
+    patch = merge_sources(base_frames, df_enrich, df_oc, verbose=False)
+
+    # Patch the merged file: drop stale rows, add the re-resolved ones, in
+    # the row order a full merge of the current sources gives (a new id
+    # does not always go last: new base ids come before enrich-only ones)
+    existing = load_csv(out_path)
+    stale = existing['id'].map(id_key).isin(delta).to_numpy()
+    merged = pd.concat([existing[~stale], patch], ignore_index=True)
+    order = output_order([frames[p] for role, p in current if role == 'base'],
+                         frames.get(enrich_path), frames.get(oc_path))
+    position = pd.Series(np.arange(len(order)), index=order)
+    merged = merged.iloc[np.argsort(merged['id'].map(id_key).map(position).to_numpy(), kind='stable')]
+    merged = merged[list(existing.columns) + [c for c in merged.columns if c not in existing.columns]]
+
+    print(f"💾 Patching merged file ({len(patch)} rows re-resolved, {int(stale.sum())} replaced)...")
+    tmp_out = out_path + '.tmp'
+    merged.to_csv(tmp_out, sep='|', index=False)
+    os.replace(tmp_out, out_path)
+
+    changed_paths = {p for _, p in changed}
+    loaded = [(role, p, frames[p] if p in changed_paths else None) for role, p in current]
+    write_manifest(base_dir, out_path, loaded, manifest)
+    print(f"✅ Success! {len(merged)} games in:")
+    print(f"   {out_path}")
+    return True
+
+# === STREAMING MERGE ===
+# Rows are partitioned by a hash of their raw 'id' into spill files, each
+# partition is resolved on its own with the same merge steps as above, and
+# the sorted partition runs are k-way merged into the output. Peak memory is
+# bounded by one chunk plus one partition rather than by the whole catalog.
+
+INT_RE = re.compile(r'^[+-]?\d+$')
+BOOL_VALUES = {'True': True, 'TRUE': True, 'true': True, 'False': False, 'FALSE': False, 'false': False}
+
+def partition_of(raw_id, n):
+    if pd.isna(raw_id): return 0
+    return zlib.crc32(str(raw_id).encode('utf-8')) % n
+
+def infer_kind(s):
+    # Mirror read_csv type inference on a column of raw strings, so that
+    # chunked reads end up with the dtype a whole-file read would pick.
+    values = s.dropna()
+    if values.empty:
+        return 'empty'
+    if values.isin(list(BOOL_VALUES)).all():
+        return 'bool'
+    if pd.to_numeric(values, errors='coerce').notna().all():
+        if values.str.match(INT_RE).all():
+            return 'int'
+        return 'float'
+    return 'object'
+
+def combine_kind(a, b):
+    if a is None or a == 'empty': return b
+    if b == 'empty' or a == b: return a
+    if {a, b} == {'int', 'float'}: return 'float'
+    return 'object'
+
+def cast_kind(s, kind, has_na):
+    if kind == 'empty':
+        return pd.to_numeric(s, errors='coerce').astype('float64')
+    if kind == 'bool':
+        mapped = s.map(BOOL_VALUES)
+        return mapped.astype(bool) if not has_na else mapped.astype(object)
+    if kind == 'int' and not has_na:
+        return s.astype('int64')
+    if kind in ('int', 'float'):
+        return pd.to_numeric(s, errors='coerce').astype('float64')
+    return s
+
+def common_dtype(dtypes):
+    dtypes = list(dict.fromkeys(dtypes))
+    if len(dtypes) == 1:
+        return dtypes[0]
+    if all(pd.api.types.is_numeric_dtype(d) and not pd.api.types.is_bool_dtype(d) for d in dtypes):
+        if any(isinstance(d, pd.api.extensions.ExtensionDtype) for d in dtypes):
+            # Declared nullable columns (Int64 in one partition, Float64 in another)
+            return 'Float64' if any(pd.api.types.is_float_dtype(d) for d in dtypes) else 'Int64'
+        return np.result_type(*dtypes)
+    return object
+
+def spill_source(path, src_idx, spills, n_parts, chunksize, seq_start):
+    """Appends every row of one source to its id partition. Returns the
+    per-column kinds, NA flags and the next sequence number."""
+    sep = sniff_delimiter(path)
+    kinds, has_na = {}, {}
+    seq = seq_start
+    for chunk in pd.read_csv(path, sep=sep, dtype=str, chunksize=chunksize):
+        for col in chunk.columns:
+            kinds[col] = combine_kind(kinds.get(col), infer_kind(chunk[col]))
+            has_na[col] = has_na.get(col, False) or bool(chunk[col].isna().any())
+        chunk[SEQ_COL] = np.arange(seq, seq + len(chunk))
+        seq += len(chunk)
+        if 'id' in chunk.columns:
+            parts = chunk['id'].map(lambda x: partition_of(x, n_parts))
+        else:
+            parts = pd.Series(0, index=chunk.index)
+        for p, rows in chunk.groupby(parts, sort=False):
+            pickle.dump((src_idx, rows), spills[p])
+    return kinds, has_na, seq
+
+def load_partition(path):
+    frames = {}
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                src_idx, rows = pickle.load(f)
+            except EOFError:
+                break
+            frames.setdefault(src_idx, []).append(rows)
+    return frames
+
+def typed_source(chunks, columns, kinds, has_na):
+    # Declared columns get the schema dtypes load_csv uses, the rest the
+    # dtype a whole-file read would infer
+    df = pd.concat(chunks, ignore_index=True)
+    schema = schema_for(columns)
+    for col in columns:
+        if col in schema:
+            df[col] = coerce_column(df[col], schema[col])
+        else:
+            df[col] = cast_kind(df[col], kinds[col], has_na[col])
+    return df
+
+def resolve_partition(frames, sources):
+    typed = {role: [] for role in SOURCES}
+    for i, (role, columns, kinds, has_na) in enumerate(sources):
+        if i in frames:
+            typed[role].append(typed_source(frames[i], columns, kinds, has_na))
+    by_source = {
+        'base': dedupe_base(pd.concat(typed['base'], ignore_index=True)) if typed['base'] else None,
+        'enrich': dedupe_source(typed['enrich'][0]) if typed['enrich'] else None,
+        'oc': dedupe_source(typed['oc'][0]) if typed['oc'] else None,
+    }
+    # SEQ_COL resolves to the row of the source that introduced the id,
+    # which is exactly its position in the in-memory output.
+    return resolve_precedence(by_source, precedence={SEQ_COL: SOURCES})
+
+def output_columns(sources):
+    columns = ordered_union([pd.Index(s[1]) for s in sources])
+    return ['id'] + [c for c in columns if c != 'id']
+
+def row_lines(df):
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter='|', lineterminator='\n')
+    values = df.astype(object).where(df.notna(), '')
+    for row in values.itertuples(index=False, name=None):
+        buf.seek(0)
+        buf.truncate()
+        writer.writerow(row)
+        yield buf.getvalue()
+
+def read_run(path):
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                batch = pickle.load(f)
+            except EOFError:
+                return
+            yield from batch
+
+def run_streaming_merge(base_paths, enrich_path, oc_path, out_path,
+                        partitions=STREAM_PARTITIONS, chunksize=STREAM_CHUNKSIZE):
+    print(f"🌊 Streaming merge ({partitions} partitions, chunks of {chunksize} rows)...")
+    base_paths = [p for p in base_paths if os.path.exists(p)]
+    if not base_paths:
+        print("❌ No base files found. Exiting.")
+        return
+    inputs = [('base', p) for p in base_paths]
+    if os.path.exists(enrich_path): inputs.append(('enrich', enrich_path))
+    if os.path.exists(oc_path): inputs.append(('oc', oc_path))
+
+    spill_dir = tempfile.mkdtemp(prefix='merge_spill_', dir=os.path.dirname(out_path))
+    try:
+        # 1. Partition every source by hashed id
+        print("📂 Partitioning sources...")
+        spill_paths = [os.path.join(spill_dir, f'part_{p:04d}.pkl') for p in range(partitions)]
+        spills = [open(p, 'wb') for p in spill_paths]
+        sources = []  # (role, columns, kinds, has_na)
+        seq = 0
+        try:
+            for src_idx, (role, path) in enumerate(inputs):
+                print(f"   {os.path.basename(path)}")
+                columns = read_header(path)
+                kinds, has_na, seq = spill_source(path, src_idx, spills, partitions, chunksize, seq)
+                kinds = {c: kinds.get(c, 'empty') for c in columns}
+                has_na = {c: has_na.get(c, True) for c in columns}
+                sources.append((role, columns, kinds, has_na))
+        finally:
+            for f in spills: f.close()
+        print(f"   Rows spilled: {seq}")
+
+        # 2. Resolve "keep last" and source precedence one partition at a time
+        print("🔀 Resolving partitions...")
+        columns = output_columns(sources)
+        resolved_paths = []
+        part_dtypes = {c: [] for c in columns}
+        for p, path in enumerate(spill_paths):
+            frames = load_partition(path)
+            os.remove(path)
+            if not frames:
+                continue
+            df_part = resolve_partition(frames, sources)
+            if len(df_part) == 0:
+                continue
+            df_part['__key'] = df_part[SEQ_COL]
+            df_part = df_part.reindex(columns=columns + ['__key'])
+            for c in columns:
+                part_dtypes[c].append(df_part[c].dtype)
+            resolved = os.path.join(spill_dir, f'resolved_{p:04d}.pkl')
+            df_part.to_pickle(resolved)
+            resolved_paths.append(resolved)
+
+        # 3. Cast partitions to the dtypes a single frame would have,
+        #    write sorted runs and k-way merge them into the output.
+        print("💾 Writing merged file...")
+        target = {c: common_dtype(d) for c, d in part_dtypes.items() if d}
+        run_paths = []
+        for resolved in resolved_paths:
+            df_part = pd.read_pickle(resolved)
+            os.remove(resolved)
+            for c, dt in target.items():
+                if df_part[c].dtype != dt:
+                    df_part[c] = df_part[c].astype(dt)
+            df_part = df_part.sort_values('__key', kind='stable')
+            keys = df_part.pop('__key')
+            run_path = resolved.replace('resolved_', 'run_')
+            with open(run_path, 'wb') as f:
+                batch = []
+                for key, line in zip(keys, row_lines(df_part)):
+                    batch.append((key, line))
+                    if len(batch) >= chunksize:
+                        pickle.dump(batch, f)
+                        batch = []
+                if batch:
+                    pickle.dump(batch, f)
+            run_paths.append(run_path)
+
+        total = 0
+        tmp_out = out_path + '.tmp'
+        with open(tmp_out, 'w', encoding='utf-8', newline='') as out:
+            csv.writer(out, delimiter='|', lineterminator='\n').writerow(columns)
+            for _, line in heapq.merge(*[read_run(p) for p in run_paths], key=lambda kv: kv[0]):
+                out.write(line)
+                total += 1
+        os.replace(tmp_out, out_path)
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+    print(f"✅ Success! Saved {total} games to:")
+    print(f"   {out_path}")
+
 if __name__ == "__main__":
-    run_merge()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Merge base, enrichment and OpenCritic CSVs into merged_all_games.csv")
+    parser.add_argument('--stream', action='store_true', help="Bounded-memory merge through on-disk id partitions")
+    parser.add_argument('--incremental', action='store_true', help="Only re-resolve ids changed since the last merge (see manifest)")
+    parser.add_argument('--partitions', type=int, default=STREAM_PARTITIONS, help="Number of id partitions (streaming mode)")
+    parser.add_argument('--chunksize', type=int, default=STREAM_CHUNKSIZE, help="Rows per read chunk (streaming mode)")
+    parser.add_argument('--workers', type=int, default=None, help="Processes used to load base files (default: one per CPU, 1 = serial)")
+    args = parser.parse_args()
+    run_merge(streaming=args.stream, incremental=args.incremental, partitions=args.partitions,
+              chunksize=args.chunksize, workers=args.workers)
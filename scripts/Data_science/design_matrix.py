@@ -0,0 +1,88 @@
+"""
+Design matrix shared by the parallel workers of the modele_v* scripts
+(hyperparameter search, permutation importance).
+
+joblib pickles a DataFrame into every worker, object-typed 'studio' column
+included, so worker startup and memory grow with the core count. Here the
+model inputs are encoded once into a float32 array, categorical columns as
+integer codes of a fixed vocabulary, and saved as a .npy file that is
+opened memory-mapped: joblib hands a memmap to its workers as a reference
+to the file, every worker reads the same pages.
+
+    train = shared_matrix(X_train, features_num + features_cat, {'studio': None})
+    test = shared_matrix(X_test, train.columns, train.categories)
+    try:
+        model.fit(train.array, y_train)
+        permutation_importance(model, test.array, y_test, n_jobs=-1)
+    finally:
+        train.remove(); test.remove()
+
+The vocabulary of a categorical column is its MAX_CATEGORIES - 1 most
+frequent values seen at least MIN_COUNT times, sorted: codes are stable for
+a given vocabulary, which is saved with the model (model_registry). Rarer
+values and values outside the vocabulary share the last code
+(len(vocabulary)), missing values stay NaN. The codes go to
+HistGradientBoostingRegressor as native categorical features
+(categorical_features=column_indices(...)): one column per categorical
+feature instead of a dense one-hot block, and at most MAX_CATEGORIES codes
+so they fit in the estimator's bins.
+"""
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+MAX_CATEGORIES = 100        # codes per column, rare bucket included (HGB takes up to 255)
+MIN_COUNT = 5               # rarer values go to the rare bucket
+
+def vocabulary(values, max_categories=MAX_CATEGORIES, min_count=MIN_COUNT):
+    """Sorted most frequent non-missing values, as strings."""
+    counts = values.dropna().astype(str).value_counts()
+    counts = counts[counts >= min_count]
+    # Ties broken by value, so the vocabulary does not depend on row order
+    frequent = sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))[:max_categories - 1]
+    return sorted(value for value, _ in frequent)
+
+def category_codes(values, vocab):
+    codes = pd.Categorical(values.astype(object).map(str, na_action='ignore'), categories=vocab).codes
+    codes = codes.astype(np.float32)
+    codes[codes < 0] = len(vocab)
+    codes[values.isna().to_numpy()] = np.nan
+    return codes
+
+def encode(df, columns, categories=None):
+    """(float32 array, categories) of df[columns]. categories maps each
+    categorical column to its vocabulary, None to learn it from df."""
+    categories = {col: vocab if vocab is not None else vocabulary(df[col])
+                  for col, vocab in (categories or {}).items()}
+    out = np.empty((len(df), len(columns)), dtype=np.float32)
+    for j, col in enumerate(columns):
+        if col in categories:
+            out[:, j] = category_codes(df[col], categories[col])
+        else:
+            out[:, j] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float32, na_value=np.nan)
+    return out, categories
+
+def column_indices(columns, names):
+    return [list(columns).index(n) for n in names]
+
+class SharedMatrix:
+    """float32 .npy file opened memory-mapped (read-only) as .array"""
+
+    def __init__(self, path, columns, categories):
+        self.path = path
+        self.columns = list(columns)
+        self.categories = categories
+        self.array = np.load(path, mmap_mode='r')
+
+    def remove(self):
+        self.array = None
+        shutil.rmtree(os.path.dirname(self.path), ignore_errors=True)
+
+def shared_matrix(df, columns, categories=None, folder=None):
+    array, categories = encode(df, columns, categories)
+    path = os.path.join(tempfile.mkdtemp(prefix='design_matrix_', dir=folder), 'X.npy')
+    np.save(path, array)
+    return SharedMatrix(path, columns, categories)
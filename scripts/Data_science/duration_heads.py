@@ -0,0 +1,58 @@
+"""
+Main, extra and completionist durations from one training run.
+
+The main-time model is unchanged; extra and completionist come from ratio
+heads: regressors of log(hltbExtra / hltbMain) and
+log(hltbCompletionist / hltbMain) fitted on the same design matrix, so the
+features are built (and encoded) once. A head predicts the ratio per game
+instead of the static median ratio of model_registry.completion_ratios (or
+the per-genre genre_ratios.json).
+
+    model = fit_heads(main_model, train.array, times_train, lambda col: make_head())
+    model.predict(X)          # main time, as before
+    model.predict_ratios(X)   # {'hltbExtra': ratios, 'hltbCompletionist': ratios}
+
+The saved estimator is the DurationHeads: predict.py and serve.py score the
+three columns in the same pass over the design matrix.
+"""
+import numpy as np
+
+from model_registry import RATIO_COLUMNS, TARGET
+
+class DurationHeads:
+    """Main-time estimator plus one log-ratio regressor per RATIO_COLUMNS."""
+
+    def __init__(self, main, heads):
+        self.main = main
+        self.heads = heads
+
+    def predict(self, X):
+        return self.main.predict(X)
+
+    def predict_ratios(self, X):
+        return {col: np.exp(head.predict(X)) for col, head in self.heads.items()}
+
+    def estimators(self):
+        """The boosting models: main (last Pipeline step), then the heads."""
+        main = self.main.steps[-1][1] if hasattr(self.main, 'steps') else self.main
+        return [main] + list(self.heads.values())
+
+def log_ratios(times, col):
+    """(mask, log(times[col] / times[TARGET])) over the rows with both times."""
+    main = times[TARGET].to_numpy(dtype=float, na_value=np.nan)
+    other = times[col].to_numpy(dtype=float, na_value=np.nan)
+    mask = (main > 0) & (other > 0)
+    return mask, np.log(other[mask] / main[mask])
+
+def fit_heads(main, X, times, make_head):
+    """DurationHeads of the fitted main estimator and a make_head(col)
+    regressor per ratio column, fitted on the rows of X whose times has both
+    times."""
+    heads = {}
+    for col in RATIO_COLUMNS:
+        mask, target = log_ratios(times, col)
+        head = make_head(col)
+        head.fit(X[mask], target)
+        heads[col] = head
+        print(f"   {col} head: {int(mask.sum())} games")
+    return DurationHeads(main, heads)
@@ -0,0 +1,280 @@
+"""
+Feature registry shared by the modele_v* scripts.
+
+Every feature is registered once with the columns it reads:
+
+    @feature('INT_Quality_RPG', inputs=['quality_index', 'is_rpg'])
+    def int_quality_rpg(df):
+        return df['quality_index'] * df['is_rpg']
+
+Inputs are dataset columns or other features. FeatureGraph(df).get(names)
+walks the dependency graph from the requested names only, builds each
+feature once and memoizes it, so a model pays for the features it uses and
+nothing else. A feature that emits several columns from one pass (keyword
+flag tables) is registered with a list of outputs and a node name.
+
+An input that is also one of the node's own outputs is read from the
+dataset ('hltbMain' is cleaned from the raw 'hltbMain').
+
+Bump a feature's version whenever its output changes: the feature store
+(feature_store.py) keys persisted values on signature(), which covers the
+versions of every feature upstream.
+"""
+import hashlib
+import json
+import os
+import sys
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from csv_schema import DATE_COLUMNS, date_part_columns, split_date
+from features import franchise_momentum, keyword_flags, release_year, studio_average
+
+Feature = namedtuple('Feature', ['name', 'outputs', 'inputs', 'version', 'build'])
+
+FEATURES = {}   # node name -> Feature
+PRODUCER = {}   # output column -> node name
+
+def feature(outputs, inputs, version=1, name=None):
+    """Registers build(df) -> Series (one output) or DataFrame (outputs)."""
+    outputs = [outputs] if isinstance(outputs, str) else list(outputs)
+    name = name or outputs[0]
+
+    def register(build):
+        if name in FEATURES:
+            raise ValueError(f"feature '{name}' registered twice")
+        FEATURES[name] = Feature(name, outputs, list(inputs), version, build)
+        for col in outputs:
+            PRODUCER[col] = name
+        return build
+    return register
+
+def node_inputs(node):
+    """(column, producing node or None for the dataset) per input of node."""
+    return [(col, None if col in node.outputs else PRODUCER.get(col)) for col in node.inputs]
+
+_signatures = {}
+
+def signature(name):
+    if name not in _signatures:
+        node = FEATURES[name]
+        deps = [signature(dep) if dep else f"raw:{col}" for col, dep in node_inputs(node)]
+        key = json.dumps([name, node.version, node.outputs, deps])
+        _signatures[name] = hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+    return _signatures[name]
+
+def raw_inputs(columns):
+    """Dataset columns the given columns are computed from."""
+    raw, seen, todo = set(), set(), list(columns)
+    while todo:
+        col = todo.pop()
+        name = PRODUCER.get(col)
+        if name is None:
+            raw.add(col)
+        elif name not in seen:
+            seen.add(name)
+            for dep_col, dep in node_inputs(FEATURES[name]):
+                if dep is None:
+                    raw.add(dep_col)
+                else:
+                    todo.append(dep_col)
+    return sorted(raw)
+
+# === EVALUATION ===
+class FeatureGraph:
+    """Lazy, memoized evaluation of registered features over one dataset.
+    data is a DataFrame or a function returning it (called on first need)."""
+
+    def __init__(self, data):
+        self._data = data
+        self.values = {}        # column -> Series
+        self.built = []         # node names built by this graph, in order
+
+    def raw(self):
+        if callable(self._data):
+            self._data = self._data()
+        return self._data
+
+    def raw_column(self, col):
+        return self.raw()[col].reset_index(drop=True)
+
+    def get(self, columns):
+        """DataFrame with the requested columns (features or dataset columns)."""
+        for col in columns:
+            self.resolve(col)
+        return pd.DataFrame({col: self.values[col] for col in columns})
+
+    def resolve(self, col):
+        if col not in self.values:
+            name = PRODUCER.get(col)
+            if name is None:
+                self.values[col] = self.raw_column(col)
+            else:
+                for out, values in self.node_values(name, [col]).items():
+                    self.values[out] = values
+        return self.values[col]
+
+    def node_values(self, name, columns):
+        """DataFrame holding at least columns of node name."""
+        return self.build(name)
+
+    def inputs(self, name):
+        """DataFrame of the input columns of node name."""
+        return pd.DataFrame({col: self.raw_column(col) if dep is None else self.resolve(col)
+                             for col, dep in node_inputs(FEATURES[name])})
+
+    def build(self, name):
+        node = FEATURES[name]
+        out = node.build(self.inputs(name))
+        if isinstance(out, pd.Series):
+            out = out.to_frame(node.outputs[0])
+        self.built.append(name)
+        return out[node.outputs].reset_index(drop=True)
+
+# === KEYWORD TABLES ===
+# flag -> substrings, all flags of a table in one scan (features.keyword_flags)
+TITLE_FLAGS = {
+    'is_dlc_keyword': ['dlc', 'expansion', 'pack', 'pass', 'season'],
+    'is_demo': ['demo', 'prologue', 'teaser'],
+}
+META_FLAGS = {
+    # Filter
+    'is_mmo_service': ['mmo ', 'mmorpg', 'online only', 'multiplayer only', 'esports'],
+    'is_strict_endless': ['farming', 'agricultural', 'flight', 'train', 'truck', 'space sim', 'sandbox', 'mmo'],
+    'is_pure_endless': ['grand strategy', '4x', 'sports', 'racing', 'manager'],
+    # RPG Sub-genres
+    'KW_JRPG': ['jrpg', 'japanese rpg', 'anime'],
+    'KW_PartyBased': ['party-based', 'party based', 'crpg'],
+    'KW_DungeonCrawler': ['dungeon crawler', 'blobber'],
+    'is_rpg': ['rpg'],
+    # Platformer Sub-genres
+    'KW_Platformer': ['platformer', 'platforming'],
+    'KW_3D': ['3d platformer', '3d'],
+    'KW_2D': ['2d platformer', '2d', 'side scroller'],
+    # Strategy Sub-genres
+    'KW_Strategy': ['strategy', 'tactical', 'rts'],
+    'KW_4X': ['4x', 'grand strategy'],
+    # Other mechanics (V20)
+    'KW_TurnBased': ['turn-based', 'tbs'],
+    'KW_Management': ['management', 'base building', 'farming', 'crafting'],
+    'KW_SideContent': ['side quests', 'exploration', 'open world', 'collectibles'],
+    'KW_SoulsLike': ['soulslike', 'souls-like', 'souls'],
+    'is_indie': ['indie'],
+    # Reporting only
+    'KW_Shooter': ['shooter'],
+    'KW_Puzzle': ['puzzle'],
+}
+# V10 genre flags, matched on the lowercased genres list
+V10_GENRES = ['Open world', 'Metroidvania', 'Souls-like', 'Roguelike', 'JRPG', 'RPG', 'Action', 'Adventure', 'Strategy']
+GENRE_FLAGS = {f'KW_{g.lower().replace(" ", "_")}': [g.lower()] for g in V10_GENRES}
+
+# === CLEANING ===
+@feature('hltbMain', inputs=['hltbMain'])
+def hltb_main(df):
+    return pd.to_numeric(df['hltbMain'], errors='coerce').fillna(0)
+
+@feature('steamReviewCount', inputs=['steamReviewCount'])
+def steam_review_count(df):
+    return pd.to_numeric(df['steamReviewCount'], errors='coerce').fillna(0)
+
+@feature('log_review_count', inputs=['steamReviewCount'])
+def log_review_count(df):
+    return np.log1p(df['steamReviewCount'])
+
+@feature('quality_index', inputs=['opencriticScore', 'igdbScore', 'steamReviewPercent'])
+def quality_index(df):
+    return df[['opencriticScore', 'igdbScore', 'steamReviewPercent']].mean(axis=1).fillna(70)
+
+@feature('log_hypes', inputs=['hypes'])
+def log_hypes(df):
+    return np.log1p(pd.to_numeric(df['hypes'], errors='coerce').fillna(0))
+
+# === HISTORY ===
+@feature(list(date_part_columns('releaseDate')), inputs=['releaseDate'], name='release_date')
+def release_date(df):
+    # Same bulk parse, explicit format, as read_pipe_csv(date_parts=True)
+    year, day = split_date(df['releaseDate'], DATE_COLUMNS['releaseDate'])
+    return pd.DataFrame(dict(zip(date_part_columns('releaseDate'), (year, day))))
+
+@feature('year_rel', inputs=['releaseDate', 'releaseDate_year'], version=2)
+def year_rel(df):
+    return release_year(df['releaseDate'], df['releaseDate_year'])
+
+@feature('franchise_momentum', inputs=['id', 'franchise', 'year_rel', 'hltbMain'])
+def franchise_momentum_feature(df):
+    # Leave-one-out, year-weighted franchise average (see features.py)
+    return franchise_momentum(df)
+
+@feature('studio_avg_time', inputs=['id', 'studio', 'hltbMain'])
+def studio_avg_time(df):
+    # Leave-one-out studio average (see features.py)
+    return studio_average(df)
+
+# === TEXT / KEYWORDS ===
+@feature('title_lower', inputs=['title'])
+def title_lower(df):
+    return df['title'].str.lower()
+
+@feature('all_meta', inputs=['genres', 'keywords', 'themes'], version=2)
+def all_meta(df):
+    # A missing part is empty: with pandas' str dtype a NaN part would make
+    # the whole concatenation NaN
+    parts = [df[col].fillna('').astype(str) for col in ('genres', 'keywords', 'themes')]
+    return (parts[0] + " " + parts[1] + " " + parts[2]).str.lower()
+
+@feature('genres_lower', inputs=['genres'])
+def genres_lower(df):
+    return df['genres'].astype(str).str.lower()
+
+@feature(list(TITLE_FLAGS), inputs=['title_lower'], name='title_flags')
+def title_flags(df):
+    return keyword_flags(df['title_lower'], TITLE_FLAGS)
+
+@feature(list(META_FLAGS), inputs=['all_meta'], name='meta_flags')
+def meta_flags(df):
+    return keyword_flags(df['all_meta'], META_FLAGS)
+
+@feature(list(GENRE_FLAGS), inputs=['genres_lower'], name='genre_flags')
+def genre_flags(df):
+    return keyword_flags(df['genres_lower'], GENRE_FLAGS)
+
+# === CONTENT TYPE ===
+@feature('is_dlc', inputs=['isDlc'])
+def is_dlc(df):
+    return df['isDlc'].astype(int)
+
+@feature('is_dlc_explicit', inputs=['isDlc'])
+def is_dlc_explicit(df):
+    return df['isDlc'].map({'True': 1, 'False': 0, True: 1, False: 0}).fillna(0)
+
+@feature('is_content_expansion', inputs=['is_dlc_explicit', 'is_dlc_keyword', 'is_demo'])
+def is_content_expansion(df):
+    return df[['is_dlc_explicit', 'is_dlc_keyword', 'is_demo']].max(axis=1)
+
+# === AAA PROXY / INTERACTIONS ===
+@feature('is_high_pop', inputs=['log_review_count'])
+def is_high_pop(df):
+    return (df['log_review_count'] > 9.9).astype(int)
+
+@feature('is_AAA_proxy', inputs=['is_high_pop', 'is_indie'])
+def is_aaa_proxy(df):
+    return ((df['is_high_pop'] == 1) & (df['is_indie'] == 0)).astype(int)
+
+@feature('INT_JRPG_AAA', inputs=['KW_JRPG', 'is_AAA_proxy'])
+def int_jrpg_aaa(df):
+    return df['KW_JRPG'] * df['is_AAA_proxy']
+
+@feature('INT_3D_Platformer', inputs=['KW_3D', 'KW_Platformer'])
+def int_3d_platformer(df):
+    return df['KW_3D'] * df['KW_Platformer']
+
+@feature('INT_Quality_RPG', inputs=['quality_index', 'is_rpg'])
+def int_quality_rpg(df):
+    return df['quality_index'] * df['is_rpg']
+
+@feature('INT_Quality_Strategy', inputs=['quality_index', 'KW_Strategy'])
+def int_quality_strategy(df):
+    return df['quality_index'] * df['KW_Strategy']
@@ -0,0 +1,117 @@
+"""
+Persistent feature store for the modele_v* scripts.
+
+Features are the ones of feature_registry.py, evaluated lazily (only what the
+requested columns depend on) and materialized as one Parquet file per
+feature node in .feature_store/<dataset hash>/ next to the dataset:
+  - the dataset hash is the sha1 of the CSV content (re-hashed only when its
+    size or mtime changes), a new export gets a fresh folder
+  - a node file is keyed on the node's signature (its version and those of
+    everything upstream): bumping one version recomputes that feature and
+    its dependents only
+  - load_features(path, columns) reads just the requested columns; columns
+    no feature produces come from the dataset itself (read_pipe_csv), which
+    is only parsed when something needs it (a .parquet dataset is read as is)
+
+    df = load_features(CSV_PATH, ['title', 'hltbMain', 'quality_index', 'KW_JRPG'])
+
+Set FEATURE_STORE=0 to compute everything in memory without persisting.
+"""
+import json
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from csv_cache import file_hash
+from csv_schema import add_date_parts
+from pipe_csv import read_pipe_csv
+from feature_registry import FeatureGraph, signature
+
+STORE_DIRNAME = '.feature_store'
+SOURCES_FILE = 'sources.json'
+
+def store_enabled():
+    return os.environ.get('FEATURE_STORE', '1') not in ('0', 'false', 'off')
+
+def read_dataset(path, date_parts=False):
+    """Games table at path: a pipe-delimited export or a Parquet file."""
+    if path.endswith('.parquet'):
+        df = pd.read_parquet(path)
+        return add_date_parts(df) if date_parts else df
+    return read_pipe_csv(path, date_parts=date_parts)
+
+# === DATASET KEY ===
+def dataset_hash(path, store_root):
+    """Content sha1 of path, recomputed only when size / mtime moved. Folders
+    of hashes no source points to anymore are removed."""
+    sources_path = os.path.join(store_root, SOURCES_FILE)
+    try:
+        with open(sources_path, 'r', encoding='utf-8') as f:
+            sources = json.load(f)
+    except (OSError, ValueError):
+        sources = {}
+    st = os.stat(path)
+    key = os.path.abspath(path)
+    entry = sources.get(key)
+    if entry and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+        return entry['sha1']
+
+    digest = file_hash(path)
+    old = entry['sha1'] if entry else None
+    sources[key] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha1': digest}
+    os.makedirs(store_root, exist_ok=True)
+    with open(sources_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(sources, f, indent=1)
+    os.replace(sources_path + '.tmp', sources_path)
+    if old and old != digest and old not in {e['sha1'] for e in sources.values()}:
+        remove_folder(os.path.join(store_root, old[:16]))
+    return digest
+
+def remove_folder(folder):
+    if not os.path.isdir(folder):
+        return
+    for name in os.listdir(folder):
+        os.remove(os.path.join(folder, name))
+    os.rmdir(folder)
+
+# === STORE ===
+class FeatureStore(FeatureGraph):
+    """FeatureGraph whose feature nodes are read from / written to the store."""
+
+    def __init__(self, path):
+        FeatureGraph.__init__(self, lambda: read_dataset(path))
+        self.path = path
+        self.persist = store_enabled()
+        self.folder = None
+        if self.persist:
+            root = os.path.join(os.path.dirname(os.path.abspath(path)), STORE_DIRNAME)
+            self.folder = os.path.join(root, dataset_hash(path, root)[:16])
+
+    def node_path(self, name):
+        return os.path.join(self.folder, f"{name}.{signature(name)}.parquet")
+
+    def node_values(self, name, columns):
+        if self.persist and os.path.exists(self.node_path(name)):
+            return pd.read_parquet(self.node_path(name), columns=columns)
+        print(f"   Feature store: building '{name}'...")
+        frame = self.build(name)
+        if self.persist:
+            self.save(name, frame)
+        return frame
+
+    def save(self, name, frame):
+        os.makedirs(self.folder, exist_ok=True)
+        # Older definitions of this feature are stale once a new one is stored
+        for old in os.listdir(self.folder):
+            if old.startswith(name + '.') and old.endswith('.parquet'):
+                os.remove(os.path.join(self.folder, old))
+        target = self.node_path(name)
+        frame.to_parquet(target + '.tmp', index=False)
+        os.replace(target + '.tmp', target)
+
+def load_features(path, columns):
+    """DataFrame with the requested columns (dataset columns or any
+    registered feature) for the dataset at path."""
+    return FeatureStore(path).get(columns)
@@ -0,0 +1,325 @@
+"""
+Feature builders shared by the modele_v* scripts.
+
+The franchise / studio features are leave-one-out averages of hltbMain: a
+game only sees the *other* games of its group (rows with the same id are the
+same game). They are computed with group sums, never game-by-game pairs, so
+a franchise of k games costs O(k) instead of O(k^2).
+
+Keyword flags come from declarative {flag: [substrings]} tables, all matched
+in a single scan per text (KeywordFlagger). List cells (genres, keywords)
+become a sparse rows x tags matrix over an interned vocabulary (tag_matrix).
+
+    df['year_rel'] = release_year(df['releaseDate'], df['releaseDate_year'])
+    df['franchise_momentum'] = franchise_momentum(df)
+    df['studio_avg_time'] = studio_average(df)
+    df[list(FLAGS)] = keyword_flags(df['all_meta'], FLAGS)
+"""
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+MIN_MAIN = 0.1              # only games with a real hltbMain feed the averages
+NO_GROUP = ('', 'unknown')
+DEFAULT_YEAR = 2010         # unparseable dates (missing ones stay NaN)
+YEAR_DECAY = 0.5            # weight = 1 / (1 + YEAR_DECAY * |year gap|)
+MISSING = -1
+KEYWORD_CHUNK = 20000       # texts per worker task in keyword_flags(n_jobs > 1)
+
+def release_year(dates, years, default=DEFAULT_YEAR):
+    """Model year per row from the normalized year (csv_schema.split_date):
+    missing date -> NaN, date present but unparseable -> default."""
+    return years.astype(float).mask(dates.notna() & years.isna(), default)
+
+# === GROUP FEATURES ===
+def source_rows(df, group_col):
+    src = df[df['hltbMain'] > MIN_MAIN]
+    keep = src[group_col].notna() & ~src[group_col].isin(NO_GROUP)
+    src = src[keep]
+    return src.assign(_group=src[group_col].astype(str))
+
+def map_by_id(df, src, values):
+    """Per source row values -> a column over df. Every row sharing an id
+    gets the value; with duplicate ids the last group in sorted order wins."""
+    order = src.sort_values('_group', kind='stable').index
+    values = values.loc[order].dropna()
+    by_id = pd.Series(values.to_numpy(), index=src.loc[values.index, 'id'].to_numpy())
+    by_id = by_id[~by_id.index.duplicated(keep='last')]
+    return df['id'].map(by_id).fillna(MISSING)
+
+def studio_average(df, group_col='studio'):
+    """Mean hltbMain of the other games of the same studio (group sum minus
+    the game itself)."""
+    src = source_rows(df, group_col)
+    main = src['hltbMain'].astype(float)
+    group = main.groupby(src['_group'])
+    self_ = main.groupby([src['_group'], src['id']], dropna=False)
+    others = group.transform('size') - self_.transform('size')
+    total = group.transform('sum') - self_.transform('sum')
+    return map_by_id(df, src, (total / others).where(others > 0))
+
+def year_weight(gap):
+    return 1.0 / (1.0 + YEAR_DECAY * np.abs(gap))
+
+def franchise_momentum(df, group_col='franchise'):
+    """Year-proximity weighted mean hltbMain of the other games of the same
+    franchise, weight 1 / (1 + 0.5 * |year gap|). Needs df['year_rel'].
+
+    Weights only depend on the year, so each franchise is reduced to a
+    per-year histogram (sum of hltbMain, game count) and every target year
+    is scored against those few bins; the game's own rows are then removed.
+    A franchise with an unknown year anywhere gives NaN (-1), as before."""
+    src = source_rows(df, group_col)
+    f = pd.DataFrame({'g': src['_group'], 'id': src['id'],
+                      'y': src['year_rel'].astype(float), 'h': src['hltbMain'].astype(float)},
+                     index=src.index)
+    known = f['y'].notna()
+    rows = f[known]
+
+    hist = rows.groupby(['g', 'y']).agg(S=('h', 'sum'), C=('h', 'size')).reset_index()
+    bins = hist[['g', 'y']].merge(hist, on='g', suffixes=('', '_o'))
+    w = year_weight(bins['y'] - bins['y_o'])
+    bins = bins.assign(num=w * bins['S'], den=w * bins['C'])
+    totals = bins.groupby(['g', 'y'])[['num', 'den']].sum()
+
+    # The game itself (every row with its id) is not part of its own history
+    pairs = rows.rename_axis('_row').reset_index().merge(
+        rows[['g', 'id', 'y', 'h']], on=['g', 'id'], suffixes=('', '_o'))
+    w = year_weight(pairs['y'] - pairs['y_o'])
+    own = pd.DataFrame({'num': w * pairs['h_o'], 'den': w}).groupby(pairs['_row']).sum()
+
+    tot = totals.reindex(pd.MultiIndex.from_arrays([rows['g'], rows['y']])).to_numpy()
+    own = own.reindex(rows.index).to_numpy()
+    num = pd.Series(tot[:, 0] - own[:, 0], index=rows.index)
+    den = pd.Series(tot[:, 1] - own[:, 1], index=rows.index)
+
+    group = rows['h'].groupby(rows['g'])
+    self_ = rows['h'].groupby([rows['g'], rows['id']], dropna=False)
+    others = group.transform('size') - self_.transform('size')
+    missing = ~known
+    unknown = (missing.groupby(f['g']).transform('sum')
+               - missing.groupby([f['g'], f['id']], dropna=False).transform('sum'))
+    ok = (others > 0) & (unknown.loc[rows.index] == 0)
+    return map_by_id(df, src, (num / den).where(ok).reindex(src.index))
+
+class GroupLookup:
+    """studio_average / franchise_momentum of games that need not be in the
+    catalog (inference service): the catalog side is reduced once to
+    per-group tables, a game then sees the catalog games of its group with
+    another id, the same leave-one-out value a catalog game gets. Games with
+    no HLTB time get -1, as the batch features give them. Rows are looked up
+    one by one, meant for small batches."""
+
+    def __init__(self, catalog, studio_col='studio', franchise_col='franchise'):
+        self.studio_col, self.franchise_col = studio_col, franchise_col
+        src = source_rows(catalog, studio_col)
+        main = src['hltbMain'].astype(float)
+        self.studio = {g: (t, n) for g, t, n in main.groupby(src['_group']).agg(['sum', 'size']).itertuples()}
+        self.studio_own = {k: (t, n) for k, t, n in main.groupby([src['_group'], src['id']]).agg(['sum', 'size']).itertuples()}
+
+        src = source_rows(catalog, franchise_col)
+        f = pd.DataFrame({'g': src['_group'], 'id': src['id'],
+                          'y': src['year_rel'].astype(float), 'h': src['hltbMain'].astype(float)})
+        known = f[f['y'].notna()]
+        hist = known.groupby(['g', 'y'])['h'].agg(['sum', 'size']).reset_index()
+        # group -> (years, hltbMain sums, counts) of its year bins
+        self.franchise = {g: (b['y'].to_numpy(), b['sum'].to_numpy(), b['size'].to_numpy())
+                          for g, b in hist.groupby('g')}
+        self.franchise_own = {k: (b['y'].to_numpy(), b['h'].to_numpy()) for k, b in known.groupby(['g', 'id'])}
+        missing = f['y'].isna()
+        self.unknown = missing.groupby(f['g']).sum().to_dict()
+        self.unknown_own = missing.groupby([f['g'], f['id']]).sum().to_dict()
+
+    def groups(self, df, col):
+        return [str(g) if not pd.isna(g) and g not in NO_GROUP else None for g in df[col]]
+
+    def timed(self, df):
+        # Rows source_rows keeps: the batch features only score those
+        return (pd.to_numeric(df['hltbMain'], errors='coerce') > MIN_MAIN).fillna(False).tolist()
+
+    def studio_average(self, df):
+        out = []
+        for g, game_id, timed in zip(self.groups(df, self.studio_col), df['id'], self.timed(df)):
+            if not timed:
+                out.append(MISSING)
+                continue
+            total, n = self.studio.get(g, (0.0, 0))
+            own_total, own_n = self.studio_own.get((g, game_id), (0.0, 0))
+            out.append((total - own_total) / (n - own_n) if n - own_n > 0 else MISSING)
+        return pd.Series(out, index=df.index, dtype=float)
+
+    def franchise_momentum(self, df):
+        out = []
+        for g, game_id, y, timed in zip(self.groups(df, self.franchise_col), df['id'],
+                                        df['year_rel'].astype(float), self.timed(df)):
+            if not timed or g not in self.franchise or pd.isna(y) \
+                    or self.unknown.get(g, 0) - self.unknown_own.get((g, game_id), 0) > 0:
+                out.append(MISSING)
+                continue
+            years, sums, counts = self.franchise[g]
+            w = year_weight(y - years)
+            num, den, n = group_sum(w * sums), group_sum(w * counts), counts.sum()
+            if (g, game_id) in self.franchise_own:
+                own_years, own_h = self.franchise_own[(g, game_id)]
+                w = year_weight(y - own_years)
+                num, den, n = num - group_sum(w * own_h), den - group_sum(w), n - len(own_h)
+            out.append(num / den if n > 0 else MISSING)
+        return pd.Series(out, index=df.index, dtype=float)
+
+def group_sum(values):
+    """Sum with the compensated (Kahan) rounding of pandas' groupby sum, so
+    looked-up values are bit-identical to the batch ones (a model's split
+    thresholds can sit exactly on a training value)."""
+    total = comp = 0.0
+    for v in values.tolist():
+        y = v - comp
+        t = total + y
+        comp = t - total - y
+        total = t
+    return total
+
+# === KEYWORD FLAGS ===
+class KeywordFlagger:
+    """Declarative substring flags: {flag: [patterns]}, a flag is 1 when any
+    of its patterns occurs in the text (plain `in`, like the old lambdas).
+
+    All patterns go into one regex, factored as a prefix trie, scanned once
+    per text: each search restarts one character after the previous hit so
+    overlapping patterns are all seen. The longest pattern wins at a position
+    and a hit also sets the flags of every pattern it contains
+    ("3d platformer" sets '3d' too). Rows come out bit-packed, one
+    uint64 per text, so a table holds at most 64 flags."""
+
+    def __init__(self, table):
+        self.flags = list(table)
+        if len(self.flags) > 64:
+            raise ValueError(f"{len(self.flags)} keyword flags, 64 max")
+        patterns = {p for ps in table.values() for p in ps}
+        self.masks = {}
+        for p in patterns:
+            self.masks[p] = sum(1 << bit for bit, flag in enumerate(self.flags)
+                                if any(k in p for k in table[flag]))
+        self.regex = re.compile(trie_pattern(patterns))
+
+    def bits(self, texts):
+        search, masks = self.regex.search, self.masks
+        out = np.zeros(len(texts), dtype=np.uint64)
+        for i, text in enumerate(texts):
+            if not isinstance(text, str):
+                text = ''        # missing text: no flag (str() would make it 'nan')
+            mask = 0
+            hit = search(text)
+            while hit:
+                mask |= masks[hit.group()]
+                hit = search(text, hit.start() + 1)
+            out[i] = mask
+        return out
+
+    def unpack(self, bits):
+        """bit-packed rows -> (n, n_flags) uint8 matrix"""
+        shifts = np.arange(len(self.flags), dtype=np.uint64)
+        return ((bits[:, None] >> shifts) & np.uint64(1)).astype(np.uint8)
+
+def trie_pattern(words):
+    """Regex alternation of words sharing prefixes ('2d', '2d platformer' ->
+    2d(?: platformer)?), greedy so the longest word matches."""
+    trie = {}
+    for w in words:
+        node = trie
+        for c in w:
+            node = node.setdefault(c, {})
+        node[''] = {}
+
+    def build(node):
+        alts = [re.escape(c) + build(child) for c, child in sorted(node.items()) if c]
+        if not alts:
+            return ''
+        body = alts[0] if len(alts) == 1 else '(?:' + '|'.join(alts) + ')'
+        return '(?:' + body + ')?' if '' in node else body
+    return build(trie)
+
+def keyword_flags(texts, table, n_jobs=1, chunk_size=KEYWORD_CHUNK):
+    """uint8 DataFrame, one column per flag of table, aligned on texts.
+    n_jobs > 1 scans chunks of chunk_size texts in worker processes."""
+    flagger = KeywordFlagger(table)
+    values = list(texts)
+    if n_jobs > 1 and len(values) > chunk_size:
+        chunks = [values[i:i + chunk_size] for i in range(0, len(values), chunk_size)]
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            bits = np.concatenate(list(pool.map(flagger.bits, chunks)))
+    else:
+        bits = flagger.bits(values)
+    return pd.DataFrame(flagger.unpack(bits), columns=flagger.flags, index=texts.index)
+
+# === TAG LISTS ===
+def parse_list_safe(x):
+    try:
+        if pd.isna(x): return []
+        if isinstance(x, list): return x
+        # Handle parsed JSON via pandas converter or manual check
+        cleaned = str(x).replace('""', '"')
+        if cleaned.startswith('['):
+            try:
+                return json.loads(cleaned)
+            except:
+                pass
+        return [s.strip() for s in str(x).split(',')]
+    except: 
+        return []
+
+class TagMatrix:
+    """Rows x vocabulary membership (CSR, 1 where the row has the tag) of
+    list-valued cells, vocab[j] being the tag of column j."""
+
+    def __init__(self, vocab, matrix):
+        self.vocab = vocab
+        self.matrix = matrix
+
+    def has_any(self, tags):
+        """bool per row: the row has at least one of tags"""
+        index = {t: j for j, t in enumerate(self.vocab)}
+        cols = [index[t] for t in tags if t in index]
+        if not cols:
+            return np.zeros(self.matrix.shape[0], dtype=bool)
+        return np.asarray(self.matrix[:, cols].sum(axis=1)).ravel() > 0
+
+    def dense(self, tags, prefix=''):
+        """uint8 DataFrame with one column per tag (in the given order)"""
+        index = {t: j for j, t in enumerate(self.vocab)}
+        block = self.matrix[:, [index[t] for t in tags]].toarray().astype(np.uint8)
+        return pd.DataFrame(block, columns=[f"{prefix}{t}" for t in tags])
+
+def tag_matrix(columns, normalize=str):
+    """TagMatrix of one or more list columns (strings parsed with
+    parse_list_safe), tags passed through normalize and merged into one
+    vocabulary. Cells are parsed once per distinct value and tags normalized
+    once per distinct tag, rows only carry integer codes."""
+    vocab, normalized = {}, {}
+
+    def tag_id(t):
+        key = (type(t), t) if isinstance(t, (str, int, float)) else repr(t)
+        if key not in normalized:
+            normalized[key] = vocab.setdefault(normalize(t), len(vocab))
+        return normalized[key]
+
+    parts = []
+    for values in columns:
+        codes, uniques = pd.factorize(pd.Series(values).astype(object), use_na_sentinel=True)
+        ids = [sorted({tag_id(t) for t in parse_list_safe(u)}) for u in uniques]
+        ids.append([])  # missing cells (code -1)
+        parts.append((np.where(codes < 0, len(uniques), codes), ids))
+
+    n_rows = len(parts[0][0]) if parts else 0
+    total = sp.csr_matrix((n_rows, len(vocab)), dtype=np.uint8)
+    for codes, ids in parts:
+        indptr = np.concatenate([[0], np.cumsum([len(i) for i in ids])])
+        indices = np.fromiter((j for i in ids for j in i), dtype=np.int64, count=indptr[-1])
+        per_value = sp.csr_matrix((np.ones(len(indices), dtype=np.uint8), indices, indptr),
+                                  shape=(len(ids), len(vocab)))
+        total = total + per_value[codes]
+    total.data[:] = 1
+    return TagMatrix(list(vocab), total.tocsr())
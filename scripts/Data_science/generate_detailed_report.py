@@ -3,6 +3,9 @@ import pandas as pd
 import numpy as np
 import json
 import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pipe_csv import read_pipe_csv
 
 PRED_PATH = 'scripts/Data_science/predictions_v9.csv'
 DATA_PATH = 'scripts/csv/enriched_clean_dataset.csv'
@@ -24,7 +27,7 @@ def parse_list_safe(x):
 def run_analysis():
     print("Loading Data for Analysis...")
     df_pred = pd.read_csv(PRED_PATH)
-    df_data = pd.read_csv(DATA_PATH, sep='|', on_bad_lines='skip', low_memory=False)
+    df_data = read_pipe_csv(DATA_PATH)
     
     # Merge genres from data to pred
     # Make sure IDs match type
@@ -0,0 +1,110 @@
+"""
+Feature importance for the modele_v* reports, on the design matrix the
+model was fitted on (design_matrix.py), no pipeline re-run per repeat.
+
+    importance_table(model, test.array, y_test, features, mode=IMPORTANCE_MODE)
+
+Modes:
+  - 'permutation': score drop (r2_score by default) when the columns of a
+    feature are shuffled. max_samples scores a row subsample instead of the
+    whole matrix; groups={'name': [columns]} shuffles a block of columns
+    together (with the same row permutation), so a one-hot block or a
+    feature and its interactions count as one feature. Columns outside the
+    groups stay single features.
+  - 'gain': total split gain of each feature over the fitted trees of a
+    HistGradientBoostingRegressor, as a share of the total. Computed from
+    the trees, no prediction at all: near-free, but it measures what the
+    training data rewarded, not what the test data needs.
+"""
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.metrics import r2_score
+
+MODES = ['permutation', 'gain']
+
+def feature_groups(columns, groups=None):
+    """[(name, column indices)]: the groups, then the remaining columns alone."""
+    columns = list(columns)
+    grouped = {col for cols in (groups or {}).values() for col in cols}
+    out = [(name, [columns.index(c) for c in cols]) for name, cols in (groups or {}).items()]
+    return out + [(col, [j]) for j, col in enumerate(columns) if col not in grouped]
+
+def permuted_scores(model, X, y, blocks, n_repeats, seeds, scoring):
+    """Scores of n_repeats shuffles of each block of column indices. X is
+    copied once per call (it may be a read-only memmap), each block is
+    shuffled in place and restored before the next one."""
+    X = np.array(X)
+    out = []
+    for indices, seed in zip(blocks, seeds):
+        original = X[:, indices].copy()
+        rng = np.random.RandomState(seed)
+        scores = []
+        for _ in range(n_repeats):
+            X[:, indices] = original[rng.permutation(len(X))]
+            scores.append(scoring(y, model.predict(X)))
+        X[:, indices] = original
+        out.append(np.array(scores))
+    return out
+
+def permutation(model, X, y, columns, groups=None, n_repeats=5, max_samples=None,
+                scoring=r2_score, random_state=42, n_jobs=-1):
+    """DataFrame of Feature, Importance (mean score drop), Std."""
+    rng = np.random.RandomState(random_state)
+    y = np.asarray(y)
+    if max_samples is not None:
+        n = max_samples if isinstance(max_samples, int) else int(max_samples * len(y))
+        if n < len(y):
+            rows = np.sort(rng.choice(len(y), n, replace=False))
+            X, y = X[rows], y[rows]
+    baseline = scoring(y, model.predict(X))
+    blocks = feature_groups(columns, groups)
+    seeds = rng.randint(np.iinfo(np.int32).max, size=len(blocks))
+    # One task (one copy of X) per worker, each scoring every n-th block
+    n_tasks = min(effective_n_jobs(n_jobs), len(blocks))
+    chunks = Parallel(n_jobs=n_tasks)(
+        delayed(permuted_scores)(model, X, y, [ix for _, ix in blocks[k::n_tasks]],
+                                 n_repeats, seeds[k::n_tasks], scoring)
+        for k in range(n_tasks))
+    scores = [None] * len(blocks)
+    for k, chunk in enumerate(chunks):
+        scores[k::n_tasks] = chunk
+    drops = [baseline - s for s in scores]
+    return pd.DataFrame({
+        'Feature': [name for name, _ in blocks],
+        'Importance': [d.mean() for d in drops],
+        'Std': [d.std() for d in drops],
+    })
+
+def boosting_model(model):
+    """The HistGradientBoosting estimator of a Pipeline (its last step) or itself."""
+    return model.steps[-1][1] if hasattr(model, 'steps') else model
+
+def tree_gain(model, columns):
+    """DataFrame of Feature, Importance (share of the total split gain)."""
+    estimator = boosting_model(model)
+    # With categorical features the trees index the estimator's own column
+    # order: categorical columns first, then the numerical ones
+    categorical = estimator.is_categorical_
+    if categorical is None:
+        order = np.arange(len(columns))
+    else:
+        order = np.concatenate([np.flatnonzero(categorical), np.flatnonzero(~categorical)])
+    gain = np.zeros(len(columns))
+    for trees in estimator._predictors:
+        for tree in trees:
+            splits = tree.nodes[tree.nodes['is_leaf'] == 0]
+            np.add.at(gain, order[splits['feature_idx']], splits['gain'])
+    total = gain.sum()
+    return pd.DataFrame({'Feature': list(columns), 'Importance': gain / total if total > 0 else gain})
+
+def importance_table(model, X, y, columns, mode='permutation', groups=None, max_samples=None):
+    """Importances of columns, most important first (groups and max_samples
+    only apply to the permutation mode)."""
+    if mode == 'gain':
+        table = tree_gain(model, columns)
+    elif mode == 'permutation':
+        table = permutation(model, X, y, columns, groups=groups, max_samples=max_samples)
+    else:
+        raise ValueError(f"Unknown importance mode {mode!r} (expected one of {MODES})")
+    return table.sort_values('Importance', ascending=False)
@@ -0,0 +1,131 @@
+"""
+Warm-start retraining of a saved model when new labeled games arrive.
+
+A full training grows every boosting model from scratch, with plain
+HistGradientBoostingRegressors. An incremental one loads the last saved
+version and adds WARM_FRACTION more iterations to each of its regressors,
+fitted on the updated dataset:
+  - the bin mapper and category encoder of the full fit are kept
+    (FrozenBinsRegressor), so the split thresholds and category sets of the
+    trees already grown keep their meaning; scikit-learn's own warm start
+    re-bins the new data and renumbers the categories it contains
+  - the category vocabulary saved with the model is reused, new studios go
+    to its rare bucket
+
+FrozenBinsRegressor overrides private scikit-learn methods: it only wraps a
+regressor for its warm-start fit (warm_regressor, then plain_regressor
+before saving), and warm starts are refused on scikit-learn releases
+outside SKLEARN_VERSIONS.
+
+Incremental rounds drift from what a full training would give (new games
+only correct the residuals, bins and vocabulary age), so full_retrain_reason
+asks for a full one after MAX_WARM_ROUNDS rounds, FULL_RETRAIN_HOURS, or
+when the training set grew by more than MAX_GROWTH since the last full fit.
+
+The lineage is kept in the model metadata (save_model(training=...)):
+    {'mode': 'full' | 'incremental', 'base_version': version warm-started from,
+     'rounds': incremental rounds since the full fit,
+     'full_created': date of the full fit, 'full_n_train': its training rows,
+     'full_iters': iterations of each regressor (model.estimators()) in the full fit}
+"""
+import copy
+import datetime
+import math
+
+import sklearn
+from sklearn.ensemble import HistGradientBoostingRegressor
+
+from feature_registry import PRODUCER, signature
+
+WARM_FRACTION = 0.1         # iterations added per round, fraction of the full fit's
+MAX_WARM_ROUNDS = 24        # incremental rounds before a full retrain
+FULL_RETRAIN_HOURS = 24 * 7
+MAX_GROWTH = 0.2            # training rows added since the full fit
+SKLEARN_VERSIONS = ('1.9',) # releases the FrozenBinsRegressor overrides were checked against
+
+def sklearn_supported():
+    return '.'.join(sklearn.__version__.split('.')[:2]) in SKLEARN_VERSIONS
+
+class FrozenBinsRegressor(HistGradientBoostingRegressor):
+    """HistGradientBoostingRegressor whose warm-start fits encode and bin the
+    new data with the category encoder and bin mapper of the first fit
+    instead of fitting new ones."""
+
+    def fit(self, X, y, sample_weight=None):
+        warm = self.warm_start and self._is_fitted()
+        self._frozen_bin_mapper = self._bin_mapper if warm else None
+        return super().fit(X, y, sample_weight=sample_weight)
+
+    def _preprocess_X(self, X, *, reset):
+        # The internal OrdinalEncoder numbers the categories present in the
+        # data: refitted on data lacking one, it would shift the others and
+        # the old trees' category bitsets would point at other studios.
+        # Categories unknown to the first fit become missing values.
+        if reset and self._frozen_bin_mapper is not None and self._preprocessor is not None:
+            return self._preprocessor.transform(X), self._check_categories()
+        return super()._preprocess_X(X, reset=reset)
+
+    def _bin_data(self, X, sample_weight, is_training_data):
+        if is_training_data and self._frozen_bin_mapper is not None:
+            self._bin_mapper = self._frozen_bin_mapper
+            return self._bin_mapper.transform(X)
+        return super()._bin_data(X, sample_weight, is_training_data)
+
+def warm_regressor(regressor, full_iter, fraction=WARM_FRACTION):
+    """(FrozenBinsRegressor, extra): a copy of the fitted regressor set up
+    for a warm-start fit of extra iterations, fraction of its full fit's."""
+    if not sklearn_supported():
+        raise RuntimeError(f"FrozenBinsRegressor is not checked against scikit-learn {sklearn.__version__}")
+    frozen = FrozenBinsRegressor.__new__(FrozenBinsRegressor)
+    frozen.__dict__.update(copy.deepcopy(regressor.__dict__))
+    extra = max(1, math.ceil(fraction * full_iter))
+    frozen.set_params(warm_start=True, max_iter=regressor.n_iter_ + extra)
+    return frozen, extra
+
+def plain_regressor(regressor):
+    """The fitted regressor as a plain HistGradientBoostingRegressor, to be
+    saved (and unpickled) without FrozenBinsRegressor."""
+    plain = HistGradientBoostingRegressor.__new__(HistGradientBoostingRegressor)
+    plain.__dict__.update({k: v for k, v in regressor.__dict__.items() if k != '_frozen_bin_mapper'})
+    plain.set_params(warm_start=False)
+    return plain
+
+def full_training(n_train, now=None):
+    now = now or datetime.datetime.now()
+    return {'mode': 'full', 'base_version': None, 'rounds': 0,
+            'full_created': now.isoformat(timespec='seconds'), 'full_n_train': int(n_train),
+            'full_iters': None}
+
+def incremental_training(meta, now=None):
+    training = dict(meta['training'], mode='incremental', base_version=meta['version'])
+    training['rounds'] += 1
+    return training
+
+def full_retrain_reason(meta, regressors, features, n_train, now=None):
+    """Why the saved model (meta, its regressors) cannot be warm-started on
+    n_train rows of features, None when it can."""
+    now = now or datetime.datetime.now()
+    training = meta.get('training')
+    if training is None or meta.get('categories') is None or not training.get('full_iters'):
+        return f"v{meta['version']} was not trained for warm starts"
+    if not all(isinstance(r, HistGradientBoostingRegressor) for r in regressors) \
+            or len(regressors) != len(training['full_iters']):
+        return f"v{meta['version']} regressors do not match its full fit"
+    if meta['features'] != list(features):
+        return "feature list changed"
+    stale = [col for col, sig in meta['signatures'].items()
+             if col in PRODUCER and signature(PRODUCER[col]) != sig]
+    if stale:
+        return f"feature definitions changed: {', '.join(stale)}"
+    if meta['sklearn'] != sklearn.__version__:
+        return f"scikit-learn {meta['sklearn']} -> {sklearn.__version__}"
+    if not sklearn_supported():
+        return f"warm starts need scikit-learn {' / '.join(SKLEARN_VERSIONS)}, not {sklearn.__version__}"
+    if training['rounds'] >= MAX_WARM_ROUNDS:
+        return f"{training['rounds']} incremental rounds since the full fit"
+    age = now - datetime.datetime.fromisoformat(training['full_created'])
+    if age.total_seconds() >= FULL_RETRAIN_HOURS * 3600:
+        return f"full fit is {age.days} days old"
+    if n_train > (1 + MAX_GROWTH) * training['full_n_train']:
+        return f"training set grew from {training['full_n_train']} to {n_train} rows"
+    return None
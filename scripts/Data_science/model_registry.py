@@ -0,0 +1,139 @@
+"""
+Versioned model artifacts for the modele_v* scripts.
+
+A training script saves the pipeline it evaluated instead of throwing it
+away:
+
+    save_model('v24', model, features_num + features_cat, metrics={'mae': mae},
+               module='modele_v24_final', train=df_model)
+
+Each save is a new version in models/<name>/: NNNN.joblib holds the fitted
+estimator, NNNN.json its metadata (readable without unpickling):
+  - features: the ordered input columns, and the feature_registry signature
+    of each registered one, so a scorer can tell when a feature definition
+    moved since training
+  - metrics, training row count, dataset sha1, sklearn version
+  - ratios: median hltbExtra / hltbMain and hltbCompletionist / hltbMain of
+    the training games, used to derive the extra / completionist times of
+    models without ratio heads (duration_heads.py)
+  - module: the modele_v* script that trained it (predict.py asks it for the
+    feature frame when the features are not all in the registry)
+  - categories: for a model fitted on a design_matrix array, the vocabulary
+    of each categorical column; model_inputs encodes new games with it
+  - training: full / incremental lineage of warm-started models (incremental.py)
+
+load_model(name) returns the latest version, load_model(name, version) a
+given one. predict.py scores a dataset with a saved model.
+"""
+import datetime
+import json
+import os
+import sys
+
+import joblib
+import numpy as np
+import sklearn
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from csv_cache import file_hash
+from feature_registry import PRODUCER, signature
+from design_matrix import encode
+
+MODELS_DIR = 'scripts/Data_science/models'
+TARGET = 'hltbMain'
+RATIO_COLUMNS = ['hltbExtra', 'hltbCompletionist']
+
+def model_dir(name, models_dir=MODELS_DIR):
+    return os.path.join(models_dir, name)
+
+def versions(name, models_dir=MODELS_DIR):
+    folder = model_dir(name, models_dir)
+    if not os.path.isdir(folder):
+        return []
+    return sorted(int(f[:-len('.json')]) for f in os.listdir(folder)
+                  if f.endswith('.json') and f[:-len('.json')].isdigit())
+
+def artifact_paths(name, version, models_dir=MODELS_DIR):
+    stem = os.path.join(model_dir(name, models_dir), f"{version:04d}")
+    return stem + '.joblib', stem + '.json'
+
+def feature_signatures(features):
+    """{column: signature} of the registered features among columns."""
+    return {col: signature(PRODUCER[col]) for col in features if col in PRODUCER}
+
+def completion_ratios(train):
+    """Median extra / completionist to main time ratios of the games that
+    have all three times, None when train lacks the columns."""
+    if train is None or not all(c in train.columns for c in [TARGET] + RATIO_COLUMNS):
+        return None
+    times = train[[TARGET] + RATIO_COLUMNS].astype(float)
+    times = times[(times > 0).all(axis=1)]
+    if times.empty:
+        return None
+    return {col: float(np.median(times[col] / times[TARGET])) for col in RATIO_COLUMNS}
+
+def save_model(name, model, features, metrics=None, module=None, train=None,
+               dataset=None, target_transform=None, categories=None, training=None,
+               models_dir=MODELS_DIR):
+    """Saves model as the next version of name, returns that version.
+    target_transform='log1p' marks a model trained on log1p(hours),
+    categories a model trained on design_matrix codes."""
+    version = (versions(name, models_dir) or [0])[-1] + 1
+    model_path, meta_path = artifact_paths(name, version, models_dir)
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    meta = {
+        'name': name,
+        'version': version,
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'module': module,
+        'features': list(features),
+        'signatures': feature_signatures(features),
+        'target': TARGET,
+        'target_transform': target_transform,
+        'categories': categories,
+        'training': training,
+        'metrics': {k: float(v) for k, v in (metrics or {}).items()},
+        'n_train': None if train is None else int(len(train)),
+        'ratios': completion_ratios(train),
+        'dataset': None if dataset is None else {'path': dataset, 'sha1': file_hash(dataset)},
+        'sklearn': sklearn.__version__,
+    }
+    joblib.dump(model, model_path + '.tmp')
+    os.replace(model_path + '.tmp', model_path)
+    # The metadata is written last: a version exists once its json does
+    with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=1)
+    os.replace(meta_path + '.tmp', meta_path)
+    print(f"Model saved: {name} v{version} ({model_path})")
+    return version
+
+def load_meta(name, version=None, models_dir=MODELS_DIR):
+    available = versions(name, models_dir)
+    if not available:
+        raise FileNotFoundError(f"No saved model '{name}' in {models_dir}")
+    version = available[-1] if version is None else int(version)
+    if version not in available:
+        raise FileNotFoundError(f"Model '{name}' has no version {version} (have {available})")
+    with open(artifact_paths(name, version, models_dir)[1], 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def load_model(name, version=None, models_dir=MODELS_DIR):
+    """(estimator, metadata) of a saved version, the latest by default."""
+    meta = load_meta(name, version, models_dir)
+    if meta['sklearn'] != sklearn.__version__:
+        print(f"   Warning: {name} v{meta['version']} was saved with scikit-learn {meta['sklearn']}, "
+              f"running {sklearn.__version__}")
+    stale = [col for col, sig in meta['signatures'].items()
+             if col in PRODUCER and signature(PRODUCER[col]) != sig]
+    if stale:
+        print(f"   Warning: features changed since {name} v{meta['version']} was trained: {', '.join(stale)}")
+    model = joblib.load(artifact_paths(name, meta['version'], models_dir)[0])
+    return model, meta
+
+def model_inputs(meta, X):
+    """What the saved model predicts from: X[features], or its float32
+    design matrix when the model was trained on one."""
+    X = X[meta['features']]
+    if meta.get('categories') is None:
+        return X
+    return encode(X, meta['features'], meta['categories'])[0]
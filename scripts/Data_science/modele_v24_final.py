@@ -1,136 +1,48 @@
 
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
 from sklearn.ensemble import HistGradientBoostingRegressor
-from sklearn.preprocessing import OneHotEncoder
-from sklearn.compose import ColumnTransformer
+from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
 from sklearn.metrics import mean_absolute_error, r2_score
-from sklearn.inspection import permutation_importance
+import argparse
+import os
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from feature_store import load_features
+from model_registry import RATIO_COLUMNS, completion_ratios, load_model, save_model
+from duration_heads import DurationHeads, fit_heads
+from incremental import (full_retrain_reason, full_training, incremental_training,
+                         plain_regressor, warm_regressor)
+from importance import importance_table
+from design_matrix import column_indices, encode, shared_matrix
 
 # === CONFIGURATION ===
 CSV_PATH = 'scripts/csv/enriched_clean_dataset.csv'
 REPORT_PATH = 'scripts/Data_science/rapport_analyse_v24_final.txt'
 
-# === FEATURES ===
-def calculate_franchise_feature(df):
-    def get_year(d):
-        try: return pd.to_datetime(d).year
-        except: return 2010
-    df['year_rel'] = df['releaseDate'].apply(get_year)
-    valid_source = df[df['hltbMain'] > 0.1]
-    franchise_groups = valid_source.groupby('franchise')
-    franchise_avgs = {}
-    for franch_name, group in franchise_groups:
-        if pd.isna(franch_name) or franch_name == '' or franch_name == 'unknown': continue
-        records = group[['id', 'year_rel', 'hltbMain']].to_dict('records')
-        if len(records) < 2: continue
-        for target in records:
-            tid = target['id']
-            tyear = target['year_rel']
-            numerator = 0
-            denominator = 0
-            for other in records:
-                if other['id'] == tid: continue
-                diff = abs(tyear - other['year_rel'])
-                weight = 1.0 / (1.0 + 0.5 * diff)
-                numerator += other['hltbMain'] * weight
-                denominator += weight
-            if denominator > 0:
-                franchise_avgs[tid] = numerator / denominator
-    df['franchise_momentum'] = df['id'].map(franchise_avgs).fillna(-1)
-    return df
+IMPORTANCE_MODE = 'permutation'     # or 'gain', from the fitted trees (importance.py)
+IMPORTANCE_SAMPLES = None           # test rows the permutation scores, None = all
 
-def calculate_studio_feature(df):
-    valid_source = df[df['hltbMain'] > 0.1]
-    studio_groups = valid_source.groupby('studio')
-    studio_avgs = {}
-    for studio_name, group in studio_groups:
-        if pd.isna(studio_name) or studio_name == '' or studio_name == 'unknown': continue
-        records = group[['id', 'hltbMain']].to_dict('records')
-        if len(records) < 2: continue
-        for target in records:
-            tid = target['id']
-            numerator = 0
-            denominator = 0
-            for other in records:
-                if other['id'] == tid: continue
-                numerator += other['hltbMain']
-                denominator += 1
-            if denominator > 0:
-                studio_avgs[tid] = numerator / denominator
-    df['studio_avg_time'] = df['id'].map(studio_avgs).fillna(-1)
-    return df
-
-def run_analysis():
-    print(f"Loading Data from {CSV_PATH}...")
-    df = pd.read_csv(CSV_PATH, sep='|', on_bad_lines='skip', low_memory=False)
-    
-    # Cleaning
-    df['hltbMain'] = pd.to_numeric(df['hltbMain'], errors='coerce').fillna(0)
-    df['steamReviewCount'] = pd.to_numeric(df['steamReviewCount'], errors='coerce').fillna(0)
-    df['log_review_count'] = np.log1p(df['steamReviewCount'])
-    df['quality_index'] = df[['opencriticScore', 'igdbScore', 'steamReviewPercent']].mean(axis=1).fillna(70)
-    df['log_hypes'] = np.log1p(pd.to_numeric(df['hypes'], errors='coerce').fillna(0))
-    
-    # Advanced Features
-    df = calculate_franchise_feature(df)
-    df = calculate_studio_feature(df)
-    
-    df['title_lower'] = df['title'].str.lower()
-    df['all_meta'] = df['genres'].astype(str) + " " + df['keywords'].astype(str) + " " + df['themes'].astype(str)
-    df['all_meta'] = df['all_meta'].str.lower()
-    
-    keywords_dlc = ['dlc', 'expansion', 'pack', 'pass', 'season'] 
-    keywords_demo = ['demo', 'prologue', 'teaser']
-    df['is_dlc_explicit'] = df['isDlc'].map({'True': 1, 'False': 0, True: 1, False: 0}).fillna(0)
-    df['is_dlc_keyword'] = df['title_lower'].apply(lambda x: 1 if any(k in str(x) for k in keywords_dlc) else 0)
-    df['is_demo'] = df['title_lower'].apply(lambda x: 1 if any(k in str(x) for k in keywords_demo) else 0)
-    df['is_content_expansion'] = df[['is_dlc_explicit', 'is_dlc_keyword', 'is_demo']].max(axis=1)
-    
-    # Filtering
-    keywords_mmo_service = ['mmo ', 'mmorpg', 'online only', 'multiplayer only', 'esports']
-    kw_strict_endless = ['farming', 'agricultural', 'flight', 'train', 'truck', 'space sim', 'sandbox', 'mmo']
-    keywords_pure_endless = ['grand strategy', '4x', 'sports', 'racing', 'manager']
-    def has_kw(row, kws): return 1 if any(k in row for k in kws) else 0
-    df['is_mmo_service'] = df['all_meta'].apply(lambda x: has_kw(x, keywords_mmo_service))
-    df['is_strict_endless'] = df['all_meta'].apply(lambda x: has_kw(x, kw_strict_endless))
-    df['is_pure_endless'] = df['all_meta'].apply(lambda x: has_kw(x, keywords_pure_endless))
-    
-    mask_exclude = (df['is_mmo_service'] == 1) | (df['is_strict_endless'] == 1) | (df['is_pure_endless'] == 1)
-    df_finite = df[~mask_exclude].copy()
-    mask_valid = (df_finite['hltbMain'] > 0.5) & (df_finite['hltbMain'] < 200)
-    df_model = df_finite[mask_valid].copy()
-    
-    # Sub-Genre Features
-    def has(row, kws): return 1 if any(k in row for k in kws) else 0
-    df_model['KW_JRPG'] = df_model['all_meta'].apply(lambda x: has(x, ['jrpg', 'japanese rpg', 'anime']))
-    df_model['KW_PartyBased'] = df_model['all_meta'].apply(lambda x: has(x, ['party-based', 'party based', 'crpg']))
-    df_model['KW_DungeonCrawler'] = df_model['all_meta'].apply(lambda x: has(x, ['dungeon crawler', 'blobber']))
-    df_model['KW_Platformer'] = df_model['all_meta'].apply(lambda x: has(x, ['platformer', 'platforming']))
-    df_model['KW_3D'] = df_model['all_meta'].apply(lambda x: has(x, ['3d platformer', '3d']))
-    df_model['KW_2D'] = df_model['all_meta'].apply(lambda x: has(x, ['2d platformer', '2d', 'side scroller']))
-    df_model['KW_Strategy'] = df_model['all_meta'].apply(lambda x: has(x, ['strategy', 'tactical', 'rts']))
-    df_model['KW_4X'] = df_model['all_meta'].apply(lambda x: has(x, ['4x', 'grand strategy']))
-    df_model['KW_TurnBased'] = df_model['all_meta'].apply(lambda x: has(x, ['turn-based', 'tbs']))
-    df_model['KW_Management'] = df_model['all_meta'].apply(lambda x: has(x, ['management', 'base building', 'farming', 'crafting']))
-    df_model['KW_SideContent'] = df_model['all_meta'].apply(lambda x: has(x, ['side quests', 'exploration', 'open world', 'collectibles']))
-    
-    df_model['KW_SoulsLike'] = df_model['all_meta'].apply(lambda x: has(x, ['soulslike', 'souls-like', 'souls']))
-
-    df_model['is_rpg'] = df_model['all_meta'].apply(lambda x: 1 if 'rpg' in x else 0)
-    
-    df_model['is_indie'] = df_model['all_meta'].apply(lambda x: 1 if 'indie' in x else 0)
-    df_model['is_high_pop'] = df_model['log_review_count'].apply(lambda x: 1 if x > 9.9 else 0)
-    df_model['is_AAA_proxy'] = ((df_model['is_high_pop'] == 1) & (df_model['is_indie'] == 0)).astype(int)
-    
-    # Interactions
-    df_model['INT_JRPG_AAA'] = df_model['KW_JRPG'] * df_model['is_AAA_proxy']
-    df_model['INT_3D_Platformer'] = df_model['KW_3D'] * df_model['KW_Platformer']
-    df_model['INT_Quality_RPG'] = df_model['quality_index'] * df_model['is_rpg']
-    df_model['INT_Quality_Strategy'] = df_model['quality_index'] * df_model['KW_Strategy']
+def warm_start_base(features, n_train):
+    """(model, meta) of the last saved v24 when the retrain policy lets it be
+    warm-started on n_train rows (incremental.py), else None."""
+    try:
+        model, meta = load_model('v24')
+    except FileNotFoundError:
+        print("No saved v24 model: full training")
+        return None
+    if not isinstance(model, DurationHeads):
+        reason = f"v{meta['version']} has no ratio heads"
+    else:
+        reason = full_retrain_reason(meta, model.estimators(), features, n_train)
+    if reason:
+        print(f"Full training ({reason})")
+        return None
+    return model, meta
 
+def run_analysis(incremental=False):
     features_num = [
         'log_review_count', 'franchise_momentum', 'studio_avg_time', 'is_content_expansion',
         'is_rpg', 'KW_JRPG', 'KW_PartyBased', 'KW_DungeonCrawler',
@@ -142,6 +54,17 @@ def run_analysis():
     ]
     features_cat = ['studio']
 
+    print(f"Loading Data from {CSV_PATH}...")
+    # Cleaning, franchise / studio encodings, keyword flags and interactions
+    # come materialized from the feature store (feature_store.py)
+    report_cols = ['title', 'hltbMain', 'hltbExtra', 'hltbCompletionist', 'steamReviewCount', 'is_mmo_service', 'is_strict_endless', 'is_pure_endless', 'KW_Shooter']
+    df = load_features(CSV_PATH, report_cols + features_num + features_cat)
+    
+    mask_exclude = (df['is_mmo_service'] == 1) | (df['is_strict_endless'] == 1) | (df['is_pure_endless'] == 1)
+    df_finite = df[~mask_exclude].copy()
+    mask_valid = (df_finite['hltbMain'] > 0.5) & (df_finite['hltbMain'] < 200)
+    df_model = df_finite[mask_valid].copy()
+
     X = df_model[features_num + features_cat]
     y = df_model['hltbMain']
     
@@ -154,30 +77,76 @@ def run_analysis():
     
     X_train, X_test, y_train, y_test, w_train, w_test = train_test_split(X, y, w, test_size=0.1, random_state=42)
     
-    # === OPTIMIZED MODEL ===
-    preprocessor = ColumnTransformer([
-        ('num', 'passthrough', features_num),
-        ('cat', OneHotEncoder(handle_unknown='ignore', max_categories=100, sparse_output=False), features_cat)
-    ])
-    
-    model = Pipeline([
-        ('preprocessor', preprocessor),
-        ('regressor', HistGradientBoostingRegressor(
-            loss='absolute_error', 
-            random_state=42,
-            learning_rate=0.02,        # OPTIMIZED
-            max_iter=500,              # OPTIMIZED
-            max_leaf_nodes=31,         # OPTIMIZED
-            min_samples_leaf=20,       # OPTIMIZED
-            l2_regularization=0.1      # OPTIMIZED
-        ))
-    ])
+    features = features_num + features_cat
+    base = warm_start_base(features, len(X_train)) if incremental else None
     
-    print("Training FINAL V24 Model...")
-    model.fit(X_train, y_train, regressor__sample_weight=w_train)
+    # float32 memory-mapped matrices (studio as codes, rare ones bucketed), the importance
+    # workers attach to them instead of receiving pickled frames. A warm
+    # start keeps the vocabulary of the model it continues.
+    categories = base[1]['categories'] if base else {col: None for col in features_cat}
+    train = shared_matrix(X_train, features, categories)
+    test = shared_matrix(X_test, features, train.categories)
     
-    # === REPORTING ===
-    preds_test = model.predict(X_test)
+    # === OPTIMIZED MODEL ===
+    # studio codes are split on natively (no one-hot block)
+    if base:
+        # Warm start: a few more iterations per regressor on the updated data,
+        # same bins. The test split is redrawn on the new data, so part of it
+        # was seen by earlier rounds and the test scores are optimistic.
+        previous, meta = base
+        training = incremental_training(meta)
+        warm = [warm_regressor(est, n) for est, n in zip(previous.estimators(), training['full_iters'])]
+        model = previous.main.set_params(regressor=warm[0][0])
+        warm_heads = dict(zip(previous.heads, [est for est, _ in warm[1:]]))
+        print(f"Warm-starting v24 v{meta['version']} (round {training['rounds']}, +{warm[0][1]} iterations)...")
+    else:
+        model = Pipeline([
+            ('regressor', HistGradientBoostingRegressor(
+                categorical_features=column_indices(features, features_cat),
+                loss='absolute_error', 
+                random_state=42,
+                learning_rate=0.02,        # OPTIMIZED
+                max_iter=500,              # OPTIMIZED
+                max_leaf_nodes=31,         # OPTIMIZED
+                min_samples_leaf=20,       # OPTIMIZED
+                l2_regularization=0.1      # OPTIMIZED
+            ))
+        ])
+        training = full_training(len(X_train))
+        print("Training FINAL V24 Model...")
+    
+    try:
+        t0 = time.time()
+        model.fit(train.array, y_train, regressor__sample_weight=w_train)
+        
+        # Extra / completionist: log-ratio heads on the same matrix
+        if base:
+            make_head = lambda col: warm_heads[col]
+        else:
+            make_head = lambda col: HistGradientBoostingRegressor(
+                categorical_features=column_indices(features, features_cat),
+                loss='absolute_error', random_state=42, learning_rate=0.05, max_iter=200)
+        heads = fit_heads(model, train.array, df_model.loc[y_train.index], make_head)
+        if base:
+            # Saved without the FrozenBinsRegressor wrapper
+            model.set_params(regressor=plain_regressor(model.steps[-1][1]))
+            heads.heads = {col: plain_regressor(head) for col, head in heads.heads.items()}
+        else:
+            training['full_iters'] = [est.n_iter_ for est in heads.estimators()]
+        print(f"{training['mode'].capitalize()} training done in {time.time() - t0:.1f}s")
+        
+        # === REPORTING ===
+        preds_test = model.predict(test.array)
+        ratios_test = heads.predict_ratios(test.array)
+        # Feature Importance, on the test matrix
+        print(f"Calculating Feature Importance ({IMPORTANCE_MODE})...")
+        t0 = time.time()
+        importances = importance_table(model, test.array, y_test, features, mode=IMPORTANCE_MODE,
+                                       max_samples=IMPORTANCE_SAMPLES)
+        print(f"Importance done in {time.time() - t0:.1f}s")
+    finally:
+        train.remove()
+        test.remove()
     mae = mean_absolute_error(y_test, preds_test)
     
     # Precision
@@ -191,6 +160,21 @@ def run_analysis():
     
     global_precision = calc_precision(df_eval)
     
+    # Extra / completionist MAE, heads vs the static median ratio
+    static_ratios = completion_ratios(df_model.loc[y_train.index])
+    time_metrics = {}
+    for col in RATIO_COLUMNS:
+        actual = df_eval[col].astype(float)
+        valid = (actual > 0).to_numpy()
+        time_metrics[col] = (mean_absolute_error(actual[valid], (preds_test * ratios_test[col])[valid]),
+                             mean_absolute_error(actual[valid], preds_test[valid] * static_ratios[col]))
+    
+    save_model('v24', heads, features, metrics={'mae': mae, 'precision': global_precision,
+                                                'mae_extra': time_metrics['hltbExtra'][0],
+                                                'mae_completionist': time_metrics['hltbCompletionist'][0]},
+               module='modele_v24_final', train=df_model, dataset=CSV_PATH, categories=train.categories,
+               training=training)
+    
     # Genre Analysis
     genre_metrics = []
     check_cols = {
@@ -198,7 +182,6 @@ def run_analysis():
         'Platformer': 'KW_Platformer', '3D Plat': 'INT_3D_Platformer',
         'Shooter': 'KW_Shooter', 'SoulsLike': 'KW_SoulsLike'
     }
-    df_eval['KW_Shooter'] = df_eval['all_meta'].apply(lambda x: 1 if 'shooter' in x else 0)
     
     for g, k in check_cols.items():
         if k in df_eval.columns:
@@ -211,24 +194,22 @@ def run_analysis():
     genre_df = pd.DataFrame(genre_metrics).sort_values('Precision', ascending=False)
     
     # Top 200
-    full_preds = model.predict(X)
+    full_preds = model.predict(encode(X, features, train.categories)[0])
     df_model['Predicted'] = full_preds
     top_200 = df_model.sort_values('steamReviewCount', ascending=False).head(200).copy()
     top_200['Diff'] = top_200['Predicted'] - top_200['hltbMain']
     top_200['AbsPerc'] = np.abs(top_200['Diff'] / top_200['hltbMain'])
     top_200['Status'] = top_200['AbsPerc'].apply(lambda x: "✅" if x < 0.1 else ("⚠️" if x < 0.25 else "❌"))
     
-    # Feature Importance
-    result = permutation_importance(model, X_test, y_test, n_repeats=5, random_state=42, n_jobs=-1)
-    importances = pd.DataFrame({
-        'Feature': features_num + features_cat,
-        'Importance': result.importances_mean
-    }).sort_values('Importance', ascending=False)
-    
     with open(REPORT_PATH, 'w', encoding='utf-8') as f:
         f.write("=== RAPPORT ANALYSE V24 FINAL (Optimized) ===\n\n")
         f.write(f"Global MAE: {mae:.2f}h\n")
-        f.write(f"Global Precision: {global_precision:.2f}%\n\n")
+        f.write(f"Global Precision: {global_precision:.2f}%\n")
+        if training['mode'] == 'incremental':
+            f.write(f"Training: incremental round {training['rounds']} since the full fit of {training['full_created']}\n")
+        for col, (head_mae, static_mae) in time_metrics.items():
+            f.write(f"{col} MAE: {head_mae:.2f}h (static ratio: {static_mae:.2f}h)\n")
+        f.write("\n")
         f.write(genre_df.to_string(index=False))
         f.write("\n\n")
         f.write(f"{'Title':<30} | {'Act':<6} | {'Pred':<6} | {'Diff':<6} | {'St'} | {'JRPG'} | {'Sls'}\n")
@@ -239,9 +220,12 @@ def run_analysis():
             sls = "YES" if row['KW_SoulsLike']==1 else ""
             f.write(f"{t:<30} | {row['hltbMain']:<6.1f} | {row['Predicted']:<6.1f} | {row['Diff']:<+6.1f} | {row['Status']} | {jrpg:<6} | {sls}\n")
         f.write("\n\n")
-        f.write(importances.to_string(index=False))
+        f.write(importances[['Feature', 'Importance']].to_string(index=False))
 
     print(f"Report: {REPORT_PATH}")
 
 if __name__ == "__main__":
-    run_analysis()
+    parser = argparse.ArgumentParser(description="Train the V24 duration model")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Warm-start the last saved v24 unless a full retrain is due (incremental.py)")
+    run_analysis(parser.parse_args().incremental)
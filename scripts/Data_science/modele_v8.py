@@ -4,33 +4,21 @@ import numpy as np
 import ast
 import os
 import re
-import json
-from sklearn.preprocessing import MultiLabelBinarizer
 from sklearn.ensemble import HistGradientBoostingRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, r2_score
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pipe_csv import read_pipe_csv
+from features import tag_matrix
+from feature_store import read_dataset
+from model_registry import save_model
 
 # --- CONFIG ---
 CSV_PATH = 'scripts/csv/opencritic_sync-score.csv'
 REPORT_PATH = 'scripts/Data_science/rapport_analyse_v8.txt'
-PRED_PATH = 'scripts/Data_science/predictions_full.csv'
 
 # --- UTILS ---
-def parse_list_safe(x):
-    try:
-        if pd.isna(x): return []
-        if isinstance(x, list): return x
-        # Handle parsed JSON via pandas converter or manual check
-        cleaned = str(x).replace('""', '"')
-        if cleaned.startswith('['):
-            try:
-                return json.loads(cleaned)
-            except:
-                pass
-        return [s.strip() for s in str(x).split(',')]
-    except: 
-        return []
-
 def simplify_genre(g):
     g = str(g).lower()
     if 'rpg' in g or 'role-playing' in g: return 'RPG'
@@ -65,15 +53,9 @@ def extract_franchise_fallback(title):
     
     return base
 
-def run_v8_model():
-    print("Loading Data (Model V8 - Enriched Data)...")
-    if not os.path.exists(CSV_PATH):
-        print(f"CSV not found at {CSV_PATH}")
-        return
-
-    # Load with explicit delimiter
-    df = pd.read_csv(CSV_PATH, sep='|', on_bad_lines='skip', low_memory=False, encoding='utf-8')
-    
+def build_features(df):
+    """Adds the v8 feature columns to a games table, returns (df, model
+    inputs). Shared by the training below and predict.py."""
     # 0. Clean & Prepare Columns
     df['hltbMain'] = pd.to_numeric(df['hltbMain'], errors='coerce')
     df['hltbExtra'] = pd.to_numeric(df['hltbExtra'], errors='coerce')
@@ -141,30 +123,20 @@ def run_v8_model():
     df['steamReviewCount'] = pd.to_numeric(df['steamReviewCount'], errors='coerce').fillna(0)
     df['log_reviews'] = np.log1p(df['steamReviewCount'])
     
-    # Genres
-    df['genres_list'] = df['genres'].apply(parse_list_safe)
-    df['genres_simple'] = df['genres_list'].apply(lambda gl: [simplify_genre(g) for g in gl])
-    mlb = MultiLabelBinarizer()
-    genre_matrix = mlb.fit_transform(df['genres_simple'])
-    genre_df = pd.DataFrame(genre_matrix, columns=[f"G_{g}" for g in mlb.classes_], index=df.index)
+    # Genres: cells parsed once per distinct value, simplified once per
+    # distinct genre, one-hot straight from the sparse matrix
+    genres = tag_matrix([df['genres']], normalize=simplify_genre)
+    genre_df = genres.dense(sorted(genres.vocab), prefix='G_')
+    genre_df.index = df.index
     
     if 'G_Indie' not in genre_df.columns: genre_df['G_Indie'] = 0
     df['is_Mega_Indie'] = ((genre_df['G_Indie'] == 1) & (df['steamReviewCount'] > 10000)).astype(int)
     
     
     # Explicit Keywords & Genres (Merged)
-    if 'keywords' in df.columns:
-        df['keywords_list'] = df['keywords'].apply(parse_list_safe)
-    else:
-        df['keywords_list'] = [[] for _ in range(len(df))]
-        
     # Combine normalized genres + keywords for better coverage
-    def combine_tags(row):
-        g = [str(x).lower().strip() for x in row['genres_list']]
-        k = [str(x).lower().strip() for x in row['keywords_list']]
-        return set(g + k)
-
-    df['tags_combined'] = df.apply(combine_tags, axis=1)
+    tag_columns = [df['genres']] + ([df['keywords']] if 'keywords' in df.columns else [])
+    tags = tag_matrix(tag_columns, normalize=lambda t: str(t).lower().strip())
     
     common_keywords = ['open world', 'linear', 'story rich', 'visual novel', 'multiplayer', 'co-op', 'roguelike', 'metroidvania', 'souls-like', 'soulslike']
     
@@ -173,8 +145,9 @@ def run_v8_model():
         target = k.replace('-', '')
         col_name = f"KW_{target.replace(' ', '_')}"
         
-        # Check title too for "Remake" etc
-        df[col_name] = df.apply(lambda row: 1 if k in row['tags_combined'] or target in [t.replace('-','') for t in row['tags_combined']] or k in row['title_lower'] else 0, axis=1)
+        # Tag (dash-insensitive) or title substring, the title catches "Remake" etc
+        matching = [t for t in tags.vocab if t.replace('-', '') == target]
+        df[col_name] = (tags.has_any(matching) | df['title_lower'].str.contains(k, regex=False).to_numpy()).astype(int)
 
     # Consolidate Souls-like
     # The loop above creates 'KW_soulslike' (from 'souls-like' -> 'soulslike')
@@ -193,8 +166,7 @@ def run_v8_model():
     df['INT_MegaIndie_FranMax'] = df['is_Mega_Indie'] * df['fran_max']
 
     # 7. Year Trend
-    df['releaseDate'] = pd.to_datetime(df['releaseDate'], errors='coerce')
-    df['releaseYear'] = df['releaseDate'].dt.year.fillna(2025)
+    df['releaseYear'] = df['releaseDate_year'].fillna(2025)
     df['year_norm'] = (df['releaseYear'] - 2000) / 10.0
     
     # 8. Negative Keywords
@@ -211,6 +183,29 @@ def run_v8_model():
     
     # Add genre columns
     features = pd.concat([df[base_features], genre_df], axis=1).fillna(0)
+    return df, features
+
+def prediction_features(path):
+    """(games, model inputs) of the dataset at path, for predict.py"""
+    return build_features(read_dataset(path, date_parts=True))
+
+def adjust_predictions(df, preds):
+    # Cleanup Demos & Non-Games
+    preds = np.where(df['is_non_game'] == 1, 0.0, preds)
+    demo = (df['is_demo'] == 1).to_numpy()
+    preds[demo] = np.minimum(preds[demo], 2.0)
+    return preds
+
+def run_v8_model():
+    print("Loading Data (Model V8 - Enriched Data)...")
+    if not os.path.exists(CSV_PATH):
+        print(f"CSV not found at {CSV_PATH}")
+        return
+
+    # Load with explicit delimiter
+    df = read_pipe_csv(CSV_PATH, date_parts=True)
+    df, features = build_features(df)
+    mask_train_main = (df['hltbMain'] >= 0.2) & (df['hltbMain'] <= 500)
     
     # 9. Weighting Strategy
     avg_base = df.loc[df['is_content_expansion'] == 0, 'steamReviewCount'].mean()
@@ -260,14 +255,12 @@ def run_v8_model():
     mae = mean_absolute_error(y_true, y_pred)
     median_error = np.median(np.abs(y_true - y_pred))
     r2 = r2_score(y_true, y_pred)
+    save_model('v8', est_main, X_train.columns, metrics={'mae': mae, 'median_error': median_error, 'r2': r2},
+               module='modele_v8', train=df.loc[mask_train], dataset=CSV_PATH, target_transform='log1p')
     
     # Full Prediction
     full_pred_log = est_main.predict(features)
-    df['predicted_main'] = np.expm1(full_pred_log)
-    
-    # Cleanup Demos & Non-Games
-    df.loc[df['is_non_game'] == 1, 'predicted_main'] = 0.0
-    df.loc[df['is_demo'] == 1, 'predicted_main'] = df.loc[df['is_demo'] == 1, 'predicted_main'].clip(upper=2.0)
+    df['predicted_main'] = adjust_predictions(df, np.expm1(full_pred_log))
     
     # Report
     print("Generating Report...")
@@ -0,0 +1,91 @@
+"""
+Scores a games dataset with a saved model (model_registry.py), no training.
+
+    python scripts/Data_science/predict.py --model v24
+    python scripts/Data_science/predict.py --model v8 --version 3 --input games.parquet
+
+Writes id, title, predicted_main, predicted_extra, predicted_completionist
+(the predictions_full.csv read by scripts/populate-predictions.ts), all three
+in the same pass over each chunk. Extra and completionist times are
+predicted_main scaled by the model's per-game ratios when it has ratio heads
+(duration_heads.py), by the training ratios saved with the model otherwise.
+
+Features come from the feature store (computed once per dataset, then read
+back), or from the training module's prediction_features(path) when the
+model uses features outside the registry (v8). Franchise / studio features
+need the whole catalog, so only the scoring itself runs in chunks.
+"""
+import argparse
+import importlib
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from pipe_csv import atomic_write
+from feature_store import load_features
+from model_registry import RATIO_COLUMNS, load_model, model_inputs
+
+CSV_PATH = 'scripts/csv/enriched_clean_dataset.csv'
+PRED_PATH = 'scripts/Data_science/predictions_full.csv'
+CHUNK_ROWS = 50000
+
+def prediction_inputs(meta, path):
+    """(games, model inputs, training module or None) for the dataset at path."""
+    module = importlib.import_module(meta['module']) if meta['module'] else None
+    if module is not None and hasattr(module, 'prediction_features'):
+        games, X = module.prediction_features(path)
+        # Columns the training data had and this dataset lacks (one-hot genres)
+        X = X.reindex(columns=meta['features'], fill_value=0)
+        return games, X, module
+    games = load_features(path, ['id', 'title'] + meta['features'])
+    return games, games[meta['features']], module
+
+def predict_chunks(model, X, chunk_rows=CHUNK_ROWS):
+    """(main predictions, {ratio column: per-game ratios} or None)"""
+    preds = np.empty(len(X), dtype=float)
+    ratios = {col: np.empty(len(X), dtype=float) for col in RATIO_COLUMNS} if hasattr(model, 'predict_ratios') else None
+    for start in range(0, len(X), chunk_rows):
+        chunk = X[start:start + chunk_rows]
+        preds[start:start + chunk_rows] = model.predict(chunk)
+        if ratios is not None:
+            for col, r in model.predict_ratios(chunk).items():
+                ratios[col][start:start + chunk_rows] = r
+    return preds, ratios
+
+def predict(name, version=None, path=CSV_PATH, output=PRED_PATH, chunk_rows=CHUNK_ROWS):
+    t0 = time.time()
+    model, meta = load_model(name, version)
+    print(f"Model {name} v{meta['version']} ({len(meta['features'])} features, metrics {meta['metrics']})")
+
+    games, X, module = prediction_inputs(meta, path)
+    X = model_inputs(meta, X)
+    preds, ratios = predict_chunks(model, X, chunk_rows)
+    if meta['target_transform'] == 'log1p':
+        preds = np.expm1(preds)
+    if module is not None and hasattr(module, 'adjust_predictions'):
+        preds = module.adjust_predictions(games, preds)
+
+    ratios = ratios or meta['ratios'] or {}
+    out = pd.DataFrame({'id': games['id'].to_numpy(), 'title': games['title'].to_numpy(), 'predicted_main': preds})
+    for col, name_out in zip(RATIO_COLUMNS, ['predicted_extra', 'predicted_completionist']):
+        out[name_out] = preds * ratios[col] if col in ratios else np.nan
+
+    with atomic_write(output) as f:
+        for start in range(0, len(out), chunk_rows):
+            out.iloc[start:start + chunk_rows].to_csv(f, index=False, header=(start == 0))
+    print(f"Predictions: {output} ({len(out)} games, {time.time() - t0:.1f}s)")
+    return out
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a games dataset with a saved model")
+    parser.add_argument('--model', required=True, help="Saved model name (v8, v10, v24, ...)")
+    parser.add_argument('--version', type=int, default=None, help="Model version (default: latest)")
+    parser.add_argument('--input', default=CSV_PATH, help="Games CSV (pipe-delimited) or Parquet")
+    parser.add_argument('--output', default=PRED_PATH, help="Predictions CSV")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help="Rows scored per batch")
+    args = parser.parse_args()
+    predict(args.model, args.version, args.input, args.output, args.chunk_rows)
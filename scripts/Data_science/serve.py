@@ -0,0 +1,231 @@
+"""
+Local HTTP inference service: duration predictions for one game or a small
+batch, from a saved model (model_registry.py), without a batch run.
+
+    python scripts/Data_science/serve.py --model v24 --port 8765
+
+    POST /predict  {"games": [{"id": "1942", "title": "...", "genres": ["RPG"], ...}]}
+                   (or one game object)
+               ->  {"model": "v24", "version": 3, "predictions": [{"id": "1942",
+                    "predicted_main": 31.2, "predicted_extra": 46.8, "predicted_completionist": 78.0}]}
+    GET  /health   model, version and cache statistics
+
+Game fields are the dataset columns (title, releaseDate, genres, keywords,
+themes, studio, franchise, steamReviewCount, opencriticScore, hypes, isDlc,
+...), missing ones are empty, lists may be sent as JSON arrays.
+
+The model is loaded once. Features of the posted games go through the
+feature registry, except the franchise / studio averages: those come from
+lookup tables of the catalog built at startup (features.GroupLookup), so a
+game is compared with the whole catalog, not with its batch. Predictions
+are cached (LRU) on a hash of the game fields the model's features are
+computed from, so a repeated game skips feature building too.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from csv_schema import BOOL_VALUES, COLUMN_TYPES
+from feature_registry import FeatureGraph, raw_inputs
+from feature_store import load_features
+from features import GroupLookup
+from model_registry import RATIO_COLUMNS, load_model, model_inputs
+
+CSV_PATH = 'scripts/csv/enriched_clean_dataset.csv'
+HOST = '127.0.0.1'
+PORT = 8765
+CACHE_SIZE = 4096           # predictions kept in the LRU cache
+MAX_BATCH = 1000            # games per request
+
+NUMERIC_TYPES = ('Int64', 'Float64', 'Int16')
+OUTPUTS = ['predicted_main', 'predicted_extra', 'predicted_completionist']
+
+# Registry nodes answered from the catalog tables instead of the batch
+LOOKUPS = {
+    'franchise_momentum': lambda lookup, df: lookup.franchise_momentum(df),
+    'studio_avg_time': lambda lookup, df: lookup.studio_average(df),
+}
+
+class GameGraph(FeatureGraph):
+    """FeatureGraph over posted games, group features from the lookups."""
+
+    def __init__(self, games, lookup):
+        FeatureGraph.__init__(self, games)
+        self.lookup = lookup
+
+    def raw_column(self, col):
+        games = self.raw()
+        if col not in games.columns:
+            return pd.Series(np.nan, index=range(len(games)), dtype=object)
+        return games[col].reset_index(drop=True)
+
+    def node_values(self, name, columns):
+        if name in LOOKUPS:
+            return LOOKUPS[name](self.lookup, self.inputs(name)).to_frame(name)
+        return self.build(name)
+
+def check_game(game):
+    """Raises ValueError when a field has a JSON type its column cannot take:
+    numbers and booleans go to numeric / boolean columns (or 'id'), every
+    other column takes text, lists or objects."""
+    for col, value in game.items():
+        if value is None or isinstance(value, str):
+            continue
+        dtype = COLUMN_TYPES.get(col)
+        if isinstance(value, bool):
+            ok = dtype == 'boolean'
+        elif isinstance(value, (int, float)):
+            ok = dtype in NUMERIC_TYPES or col == 'id'
+        else:
+            ok = isinstance(value, (list, dict)) and dtype not in NUMERIC_TYPES + ('boolean',)
+        if not ok:
+            raise ValueError(f"{col}: unexpected {type(value).__name__} value {value!r}")
+
+def games_frame(games):
+    """Posted game dicts -> a frame typed like the dataset columns."""
+    rows = [{k: json.dumps(v) if isinstance(v, (list, dict)) else v for k, v in g.items()} for g in games]
+    # Missing values are NaN, as read_pipe_csv gives them (not None)
+    df = pd.DataFrame(rows).astype(object).fillna(np.nan)
+    if 'id' in df.columns:
+        df['id'] = df['id'].map(str, na_action='ignore')
+    for col in df.columns:
+        dtype = COLUMN_TYPES.get(col)
+        if dtype in NUMERIC_TYPES:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype(float)
+        elif dtype == 'boolean':
+            df[col] = df[col].map(lambda v: v if isinstance(v, bool) else BOOL_VALUES.get(v, False))
+    if 'isDlc' not in df.columns:
+        df['isDlc'] = False
+    return df
+
+class LruCache:
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            if key in self.items:
+                self.items.move_to_end(key)
+                self.hits += 1
+                return self.items[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            if len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+class Predictor:
+    def __init__(self, name, version=None, catalog_path=CSV_PATH, cache_size=CACHE_SIZE):
+        self.model, self.meta = load_model(name, version)
+        if self.meta['module'] and hasattr(__import__(self.meta['module']), 'prediction_features'):
+            raise SystemExit(f"Model {name} needs whole-dataset features ({self.meta['module']}), "
+                             f"use predict.py for it")
+        print(f"Building franchise / studio lookups from {catalog_path}...")
+        catalog = load_features(catalog_path, ['id', 'studio', 'franchise', 'year_rel', 'hltbMain'])
+        self.lookup = GroupLookup(catalog)
+        self.inputs = raw_inputs(self.meta['features'])
+        self.cache = LruCache(cache_size)
+
+    def feature_key(self, game):
+        values = [game.get(col) for col in self.inputs]
+        return hashlib.sha1(json.dumps(values, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def predict(self, games):
+        keys = [self.feature_key(g) for g in games]
+        results = [self.cache.get(k) for k in keys]
+        todo = [i for i, r in enumerate(results) if r is None]
+        if todo:
+            X = GameGraph(games_frame([games[i] for i in todo]), self.lookup).get(self.meta['features'])
+            X = model_inputs(self.meta, X)
+            preds = self.model.predict(X)
+            if self.meta['target_transform'] == 'log1p':
+                preds = np.expm1(preds)
+            # Per-game ratios from the ratio heads, else the saved medians
+            if hasattr(self.model, 'predict_ratios'):
+                ratios = self.model.predict_ratios(X)
+            else:
+                ratios = {c: np.full(len(preds), r) for c, r in (self.meta['ratios'] or {}).items()}
+            for j, (i, p) in enumerate(zip(todo, preds)):
+                p = float(p)
+                extra = [p * float(ratios[c][j]) if c in ratios else None for c in RATIO_COLUMNS]
+                results[i] = dict(zip(OUTPUTS, [p] + extra))
+                self.cache.put(keys[i], results[i])
+        return [dict(id=g.get('id'), **r) for g, r in zip(games, results)]
+
+def make_handler(predictor):
+    class Handler(BaseHTTPRequestHandler):
+        def send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != '/health':
+                return self.send_json(404, {'error': 'not found'})
+            cache = predictor.cache
+            self.send_json(200, {'model': predictor.meta['name'], 'version': predictor.meta['version'],
+                                 'cache': {'size': len(cache.items), 'hits': cache.hits, 'misses': cache.misses}})
+
+        def do_POST(self):
+            if self.path != '/predict':
+                return self.send_json(404, {'error': 'not found'})
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                games = payload.get('games', [payload]) if isinstance(payload, dict) else payload
+                if not isinstance(games, list) or not all(isinstance(g, dict) for g in games):
+                    raise ValueError("expected a game object or {\"games\": [...]}")
+                if len(games) > MAX_BATCH:
+                    raise ValueError(f"{len(games)} games, {MAX_BATCH} max per request")
+                for i, g in enumerate(games):
+                    try:
+                        check_game(g)
+                    except ValueError as e:
+                        raise ValueError(f"game {i}: {e}")
+            except ValueError as e:
+                return self.send_json(400, {'error': str(e)})
+            t0 = time.perf_counter()
+            try:
+                predictions = predictor.predict(games) if games else []
+            except ValueError as e:
+                return self.send_json(400, {'error': str(e)})
+            except Exception as e:
+                self.log_error("prediction failed: %r", e)
+                return self.send_json(500, {'error': f"prediction failed: {type(e).__name__}: {e}"})
+            self.send_json(200, {'model': predictor.meta['name'], 'version': predictor.meta['version'],
+                                 'predictions': predictions,
+                                 'ms': round(1000 * (time.perf_counter() - t0), 2)})
+    return Handler
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve duration predictions over HTTP")
+    parser.add_argument('--model', required=True, help="Saved model name (v10, v24, ...)")
+    parser.add_argument('--version', type=int, default=None, help="Model version (default: latest)")
+    parser.add_argument('--catalog', default=CSV_PATH, help="Dataset the franchise / studio lookups come from")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE)
+    args = parser.parse_args()
+    predictor = Predictor(args.model, args.version, args.catalog, args.cache_size)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(predictor))
+    print(f"Serving {predictor.meta['name']} v{predictor.meta['version']} on http://{args.host}:{args.port}")
+    server.serve_forever()
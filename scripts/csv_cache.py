@@ -0,0 +1,130 @@
+"""
+Transparent columnar cache for the pipe-delimited CSVs used by the Python
+pipeline (merge_csv, enrichment scripts, Data_science models).
+
+read_csv_cached(path, **kwargs) behaves like pd.read_csv(path, **kwargs) but
+stores the parsed frame as Parquet (pickle when pyarrow is unavailable or the
+frame has mixed-type columns) in a `.csv_cache/` folder next to the source.
+An entry is keyed on the absolute path and read options, and validated
+against the source size, mtime and content hash:
+  - size + mtime unchanged  -> cached copy is read directly
+  - only mtime changed      -> content hash decides, the entry is re-stamped
+  - content changed         -> the CSV is parsed again and the entry replaced
+
+read_cached(path, parse, options) does the same for any other parser
+(see scripts/pipe_csv.py).
+
+Set CSV_CACHE=0 to bypass the cache, CSV_CACHE_DIR to move it.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+CACHE_DIRNAME = '.csv_cache'
+CACHE_VERSION = 1
+HASH_BLOCK = 1 << 20
+
+def cache_enabled():
+    return os.environ.get('CSV_CACHE', '1') not in ('0', 'false', 'off')
+
+def file_hash(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def cache_paths(path, options):
+    path = os.path.abspath(path)
+    cache_dir = os.environ.get('CSV_CACHE_DIR') or os.path.join(os.path.dirname(path), CACHE_DIRNAME)
+    options = json.dumps(options, sort_keys=True, default=str)
+    key = hashlib.sha1(f"{CACHE_VERSION}|{path}|{options}|{pd.__version__}".encode('utf-8')).hexdigest()[:16]
+    stem = os.path.join(cache_dir, f"{os.path.basename(path)}.{key}")
+    return cache_dir, stem + '.json'
+
+def read_meta(meta_path):
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_meta(meta_path, meta):
+    tmp = meta_path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(tmp, meta_path)
+
+def load_entry(meta_path, meta):
+    data_path = os.path.join(os.path.dirname(meta_path), meta['data'])
+    if meta['format'] != 'parquet':
+        return pd.read_pickle(data_path)
+    df = pd.read_parquet(data_path)
+    # Arrow hands back None for missing strings; read_csv gives NaN
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].where(df[col].notna(), np.nan)
+    return df
+
+def store_entry(meta_path, df, meta):
+    base = meta_path[:-len('.json')]
+    if HAS_PYARROW:
+        try:
+            df.to_parquet(base + '.parquet', index=False)
+            meta.update(format='parquet', data=os.path.basename(base + '.parquet'))
+            write_meta(meta_path, meta)
+            return
+        except Exception as e:
+            # Mixed-type object columns are not representable in Arrow
+            print(f"   Cache: Parquet failed ({type(e).__name__}), using pickle.")
+    df.to_pickle(base + '.pkl')
+    meta.update(format='pickle', data=os.path.basename(base + '.pkl'))
+    write_meta(meta_path, meta)
+
+def read_csv_cached(path, **read_kwargs):
+    return read_cached(path, lambda: pd.read_csv(path, **read_kwargs), read_kwargs)
+
+def read_cached(path, parse, options):
+    """parse() -> DataFrame, cached under path + options (any JSON-able
+    description of how the file is parsed)."""
+    if not cache_enabled():
+        return parse()
+
+    st = os.stat(path)
+    cache_dir, meta_path = cache_paths(path, options)
+    meta = read_meta(meta_path)
+
+    if meta is not None:
+        try:
+            if meta['size'] == st.st_size and meta['mtime_ns'] == st.st_mtime_ns:
+                return load_entry(meta_path, meta)
+            if meta['size'] == st.st_size:
+                digest = file_hash(path)
+                if meta['sha1'] == digest:
+                    meta['mtime_ns'] = st.st_mtime_ns
+                    write_meta(meta_path, meta)
+                    return load_entry(meta_path, meta)
+        except (OSError, KeyError, ValueError):
+            pass  # Broken entry: fall through to a fresh parse
+
+    df = parse()
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        meta = {
+            'source': os.path.abspath(path),
+            'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+            'sha1': file_hash(path),
+        }
+        store_entry(meta_path, df, meta)
+    except OSError as e:
+        print(f"   Cache: could not write entry for {path}: {e}")
+    return df
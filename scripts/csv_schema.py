@@ -0,0 +1,167 @@
+"""
+Declared column schema for the Checkpoint CSV layouts, so files are parsed
+once, straight into compact dtypes, instead of pipe-then-comma parsing with
+full type inference.
+
+  - Game exports (fetch-year-games, enrich-library, sync-opencritic-catalog,
+    merged_all_games, enriched_clean_dataset): pipe-delimited.
+  - Initialization/OpenCritic_data.csv and Steam_data.csv: comma-delimited,
+    d/m/Y dates.
+
+Columns not listed here are still type-inferred by pandas. Date columns are
+declared with their format but only parsed on request (parse_dates=True);
+the merge keeps them as text so they round-trip verbatim.
+
+Every date column can also be normalized into integer parts in one bulk
+parse with its declared format (add_date_parts): <col>_year and <col>_day
+(days since 1970-01-01), missing or unparseable values being NA, counted by
+unparseable_dates(df).
+"""
+import os
+import re
+
+import pandas as pd
+
+DELIMITERS = ('|', ',', '\t', ';')
+
+TEXT = 'str'
+COLUMN_TYPES = {
+    # --- Game exports ---
+    'id': TEXT, 'title': TEXT, 'coverImage': TEXT, 'backgroundImage': TEXT,
+    'description': TEXT, 'screenshots': TEXT, 'videos': TEXT,
+    'steamUrl': TEXT, 'opencriticUrl': TEXT, 'igdbUrl': TEXT, 'hltbUrl': TEXT,
+    'opencriticScore': 'Int64', 'igdbScore': 'Int64',
+    'steamAppId': TEXT, 'steamReviewScore': 'category',
+    'steamReviewCount': 'Int64', 'steamReviewPercent': 'Int64',
+    'isDlc': 'boolean', 'igdbId': TEXT, 'studio': 'category',
+    'genres': TEXT, 'platforms': TEXT, 'igdbTime': TEXT,
+    'dataMissing': 'boolean', 'dataFetched': 'boolean',
+    'hltbMain': 'Float64', 'hltbExtra': 'Float64', 'hltbCompletionist': 'Float64',
+    'storyline': TEXT, 'summary': TEXT, 'status': 'Int16', 'gameType': 'Int16',
+    'parentId': TEXT, 'relatedGames': TEXT, 'franchise': 'category',
+    'hypes': 'Int64', 'keywords': TEXT, 'themes': TEXT,
+    'dlcs': TEXT, 'ports': TEXT, 'remakes': TEXT, 'remasters': TEXT,
+    # --- Initialization/OpenCritic_data.csv & Steam_data.csv ---
+    'ID': 'Int64', 'OpenCriticTitle': TEXT, 'TopCriticAverage': 'Float64',
+    'CriticScore': 'Float64', 'Platforms': TEXT, 'Developers/Publishers': TEXT,
+    'Genres': TEXT, 'SteamTitle': TEXT, 'SteamURL': TEXT,
+    'SteamReviewsRating': 'category', 'SteamReviewsNum': 'Int64',
+    'SteamReviewsPercent': 'Float64', 'SteamDeveloper(s)': TEXT,
+    'SteamPublisher(s)': TEXT, 'SteamTags': TEXT,
+    'SteamDLC': 'boolean', 'SteamDelisted': 'boolean',
+}
+
+# Parsed only with parse_dates=True or date_parts=True (see read_typed_csv)
+DATE_COLUMNS = {
+    'releaseDate': 'ISO8601',
+    'opencriticScoreUpdatedAt': 'ISO8601',
+    'updatedAt': 'ISO8601',
+    'Date': '%d/%m/%Y',
+    'SteamReleaseDate': '%d/%m/%Y',
+}
+
+BOOL_VALUES = {'True': True, 'TRUE': True, 'true': True, 'False': False, 'FALSE': False, 'false': False}
+
+def sniff_delimiter(path):
+    # The header decides: pick the delimiter that splits it into most fields
+    with open(path, 'r', encoding='utf-8') as f:
+        header = f.readline()
+    counts = {d: header.count(d) for d in DELIMITERS}
+    best = max(DELIMITERS, key=lambda d: counts[d])
+    return best if counts[best] > 0 else '|'
+
+def read_header(path, sep=None):
+    sep = sep or sniff_delimiter(path)
+    return list(pd.read_csv(path, sep=sep, nrows=0).columns)
+
+def schema_for(columns):
+    return {c: COLUMN_TYPES[c] for c in columns if c in COLUMN_TYPES and c not in DATE_COLUMNS}
+
+def coerce_column(s, dtype):
+    """Converts raw values to a declared dtype, turning anything that does
+    not fit into NA instead of failing the whole file."""
+    if dtype == TEXT:
+        return s.astype(TEXT).where(s.notna())
+    if dtype == 'boolean':
+        return s.map(BOOL_VALUES).astype('boolean')
+    if dtype == 'category':
+        return s.astype('category')
+    values = pd.to_numeric(s, errors='coerce')
+    try:
+        return values.astype(dtype)
+    except (TypeError, ValueError):
+        # Non-integral values in an integer column
+        return values.astype('Float64')
+
+def parse_date_columns(df):
+    for col, fmt in DATE_COLUMNS.items():
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], format=fmt, errors='coerce', utc=(fmt == 'ISO8601'))
+    return df
+
+# === DATE NORMALIZATION ===
+# The date is kept as written: a UTC offset is dropped, not applied
+TZ_SUFFIX = re.compile(r'(?:Z|[+-]\d{2}:?\d{2})$')
+EPOCH = pd.Timestamp('1970-01-01')
+
+def date_part_columns(col):
+    return f"{col}_year", f"{col}_day"
+
+def split_date(values, fmt):
+    """(year Int16, day Int32) Series of one date column, parsed in bulk
+    with fmt. Missing and unparseable values are NA."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        parsed = values.dt.tz_localize(None) if values.dt.tz is not None else values
+    else:
+        text = values.astype(object).where(values.notna())
+        if fmt == 'ISO8601':
+            text = text.str.replace(TZ_SUFFIX, '', regex=True)
+        parsed = pd.to_datetime(text, format=fmt, errors='coerce')
+    years = parsed.dt.year.astype('Int16')
+    days = (parsed - EPOCH).dt.days.astype('Int32')
+    return years, days
+
+def add_date_parts(df):
+    for col, fmt in DATE_COLUMNS.items():
+        if col in df.columns:
+            year, day = date_part_columns(col)
+            df[year], df[day] = split_date(df[col], fmt)
+    return df
+
+def unparseable_dates(df):
+    """{date column: values present but not parsed} over the columns
+    add_date_parts normalized."""
+    counts = {}
+    for col in DATE_COLUMNS:
+        year = date_part_columns(col)[0]
+        if col in df.columns and year in df.columns:
+            counts[col] = int((df[col].notna() & df[year].isna()).sum())
+    return counts
+
+def report_unparseable_dates(path, df):
+    bad = {col: n for col, n in unparseable_dates(df).items() if n}
+    if bad:
+        print(f"   Unparseable dates in {os.path.basename(path)}: "
+              + ", ".join(f"{col} {n}" for col, n in bad.items()))
+
+def read_typed_csv(path, reader=pd.read_csv, parse_dates=False, date_parts=False, **kwargs):
+    """One parse with the sniffed delimiter and declared dtypes. A file whose
+    values do not match the schema is re-read with those columns as text and
+    coerced (bad cells become NA) rather than falling back to inference."""
+    sep = kwargs.pop('sep', None) or sniff_delimiter(path)
+    dtypes = schema_for(read_header(path, sep))
+    kwargs.setdefault('low_memory', False)
+    try:
+        df = reader(path, sep=sep, dtype=dtypes, **kwargs)
+    except (ValueError, TypeError) as e:
+        print(f"   Schema mismatch in {os.path.basename(path)} ({e}), coercing...")
+        df = reader(path, sep=sep, dtype={c: TEXT for c in dtypes}, **kwargs)
+        for col, dtype in dtypes.items():
+            if col in df.columns:
+                df[col] = coerce_column(df[col], dtype)
+    if date_parts:
+        df = add_date_parts(df)
+        report_unparseable_dates(path, df)
+    if parse_dates:
+        df = parse_date_columns(df)
+    return df
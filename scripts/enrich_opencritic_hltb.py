@@ -1,114 +1,83 @@
 import csv
-import re
+import os
+import sys
 from pathlib import Path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from hltb_index import convert, open_index
+from pipe_csv import PipeRows, atomic_write
+from title_match import MatchReport, load_matcher, match_report_path, match_rows
 
 # File definitions
 HLTB_FILE = Path("Initialization/hltb_dataset.csv")
 OPENCRITIC_FILE = Path("scripts/csv/opencritic_sync-score.csv")
 OUTPUT_FILE = Path("scripts/csv/opencritic_sync-score.csv") # Overwrite in place, or change to a new file for safety
 
-def normalize_title(title):
-    if not title:
-        return ""
-    # Lowercase, remove special chars, extra spaces
-    t = title.lower()
-    t = re.sub(r'[^a-z0-9\s]', '', t)
-    t = re.sub(r'\s+', ' ', t).strip()
-    return t
-
 def load_hltb_data(filepath):
     """
-    Loads HLTB data into a dictionary keyed by normalized title.
-    Returns: { normalized_title: { 'main': ..., 'extra': ..., 'completionist': ..., 'url': ... } }
+    Opens the prebuilt HLTB index (scripts/hltb_index.py), keyed by normalized
+    title with duplicate entries averaged.
+    Lookup: index.get(title) -> { 'main': hours, 'extra': hours, 'comp': hours, 'url': ... }
     """
-    print(f"Loading HLTB data from {filepath}...")
-    hltb_lookup = {}
-    count = 0
+    print(f"Loading HLTB index for {filepath}...")
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                title = row.get('name')
-                if not title:
-                    continue
-                
-                norm_title = normalize_title(title)
-                
-                # Convert times to minutes or keep as hours? 
-                # The user request implies just populating the data. 
-                # HLTB dataset usually has hours. 
-                # Let's keep them as strings or numbers as they appear, 
-                # but careful about units if the destination expects something specific.
-                # Assuming destination just wants the values.
-                
-                # HLTB dataset columns based on inspection:
-                # main_story, main_plus_sides, completionist, source_url
-                
-                hltb_lookup[norm_title] = {
-                    'hltbMain': row.get('main_story', ''),
-                    'hltbExtra': row.get('main_plus_sides', ''),
-                    'hltbCompletionist': row.get('completionist', ''),
-                    'hltbUrl': row.get('source_url', '')
-                }
-                count += 1
-        print(f"Loaded {count} HLTB records.")
+        return open_index(str(filepath))
     except Exception as e:
         print(f"Error loading HLTB data: {e}")
-    return hltb_lookup
+        return None
+
+def format_hours(hours):
+    return f"{round(convert(hours, 'hours'), 2):g}" if hours else ''
 
 def enrich_opencritic(hltb_lookup, input_path, output_path):
     print(f"Enriching OpenCritic data at {input_path}...")
     
-    # Read all data first
-    rows = []
-    fieldnames = []
-    
+    # Streamed row by row into a temp file that replaces output_path at the
+    # end, so overwriting the input in place is safe (see pipe_csv.py)
     try:
-        with open(input_path, 'r', encoding='utf-8') as f:
-            # OpenCritic file is Pipe delimited
-            reader = csv.DictReader(f, delimiter='|')
-            fieldnames = reader.fieldnames
-            rows = list(reader)
+        with PipeRows(input_path) as rows, \
+             atomic_write(output_path) as f_out, \
+             atomic_write(match_report_path(output_path)) as f_report:
+            fieldnames = rows.fieldnames
             
-        # Add new columns if they don't exist
-        new_columns = ['hltbMain', 'hltbExtra', 'hltbCompletionist', 'hltbUrl']
-        for col in new_columns:
-            if col not in fieldnames:
-                fieldnames.append(col)
-        
-        matches = 0
-        for row in rows:
-            title = row.get('name') or row.get('title') # Check header, previous inspection said 'name' is in HLTB, OC has 'id|title|coverImage...'
-            if not title:
-                continue
-            
-            norm_title = normalize_title(title)
+            # Add new columns if they don't exist
+            new_columns = ['hltbMain', 'hltbExtra', 'hltbCompletionist', 'hltbUrl']
+            for col in new_columns:
+                if col not in fieldnames:
+                    fieldnames.append(col)
             
-            if norm_title in hltb_lookup:
-                hltb_data = hltb_lookup[norm_title]
-                row['hltbMain'] = hltb_data['hltbMain']
-                row['hltbExtra'] = hltb_data['hltbExtra']
-                row['hltbCompletionist'] = hltb_data['hltbCompletionist']
-                row['hltbUrl'] = hltb_data['hltbUrl']
-                matches += 1
-            else:
-                # Initialize empty if not matched (optional, but good for consistency)
-                for col in new_columns:
-                    if col not in row:
-                        row[col] = ''
-                        
-        print(f"Enriched {matches} records out of {len(rows)} total.")
-        
-        # Write back
-        with open(output_path, 'w', encoding='utf-8', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter='|')
+            writer = csv.DictWriter(f_out, fieldnames=fieldnames, delimiter='|')
             writer.writeheader()
-            writer.writerows(rows)
+            report = MatchReport(f_report)
             
+            matches = 0
+            total = 0
+            # Check header, previous inspection said 'name' is in HLTB, OC has 'id|title|coverImage...'
+            title_of = lambda row: row.get('name') or row.get('title') or ''
+            # Exact, variant or fuzzy title match (see title_match.py)
+            for row, m in match_rows(load_matcher(hltb_lookup), rows, title_of):
+                total += 1
+                report.add(row.get('id'), title_of(row), m)
+                hltb_data = m.entry
+                
+                if hltb_data:
+                    row['hltbMain'] = format_hours(hltb_data['main'])
+                    row['hltbExtra'] = format_hours(hltb_data['extra'])
+                    row['hltbCompletionist'] = format_hours(hltb_data['comp'])
+                    row['hltbUrl'] = hltb_data['url'] or ''
+                    matches += 1
+                else:
+                    # Initialize empty if not matched (optional, but good for consistency)
+                    for col in new_columns:
+                        if col not in row:
+                            row[col] = ''
+                
+                writer.writerow(row)
+                        
+        print(f"Enriched {matches} records out of {total} total ({report.summary()}).")
         print(f"Successfully wrote updated CSV to {output_path}")
         
     except Exception as e:
-        print(f"Error processing OpenCritic CSV: {e}")
+        print(f"Error processing OpenCritic CSV (output left untouched): {e}")
 
 if __name__ == "__main__":
     hltb_data = load_hltb_data(HLTB_FILE)
@@ -0,0 +1,373 @@
+"""
+Prebuilt HowLongToBeat lookup shared by the enrichment scripts
+(enrich_with_hltb, enrich_opencritic_hltb, generate_clean_dataset).
+
+Initialization/hltb_dataset.csv is parsed once into an index keyed by
+normalized title. Duplicate entries are aggregated (average of the positive
+times), times are stored in HOURS (see UNITS). The index lives in
+Initialization/.hltb_index/ as plain .npy arrays that are memory-mapped on
+open, so a lookup table for the whole dataset is ready in milliseconds.
+
+The index is a list of segments. Each segment keeps per-title sums and counts
+rather than averages, so new rows can be appended as a new segment
+(append_rows, or rows appended to the dataset file) and still average
+correctly with older ones. Segments are compacted into one when there are
+more than MAX_SEGMENTS.
+
+    index = open_index()            # builds / refreshes when the CSV changed
+    index.get("Hollow Knight")      # {'main': 27.5, 'extra': 42.0, 'comp': 63.0, 'url': ...}
+
+CLI: python scripts/hltb_index.py [--rebuild] [--append rows.csv]
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+import pandas as pd
+
+HLTB_CSV_PATH = 'Initialization/hltb_dataset.csv'
+INDEX_DIRNAME = '.hltb_index'
+INDEX_VERSION = 2
+MAX_SEGMENTS = 8
+TIMES = ('main', 'extra', 'comp')
+# Dataset column for each time
+TIME_COLUMNS = {'main': 'main_story', 'extra': 'main_plus_sides', 'comp': 'completionist'}
+
+def normalize_title(title):
+    # The one normalization used for every HLTB lookup: lowercase,
+    # punctuation removed, whitespace collapsed
+    if not isinstance(title, str) or not title:
+        return ""
+    t = re.sub(r'[^a-z0-9\s]', '', title.lower())
+    return re.sub(r'\s+', ' ', t).strip()
+
+def normalize_titles(s):
+    # normalize_title over a whole column (object dtype so the regexes run
+    # on Python's re, Unicode-aware like normalize_title)
+    return (s.fillna('').astype(str).astype(object).str.lower()
+            .str.replace(r'[^a-z0-9\s]', '', regex=True)
+            .str.replace(r'\s+', ' ', regex=True).str.strip())
+
+def title_keys(titles):
+    return pd.util.hash_array(np.asarray(titles, dtype=object)).astype(np.uint64)
+
+def title_key(norm):
+    return title_keys([norm])[0]
+
+def default_index_dir(dataset_path):
+    return os.path.join(os.path.dirname(os.path.abspath(dataset_path)), INDEX_DIRNAME)
+
+# === UNITS ===
+# The dataset and the index hold HOURS. Callers convert explicitly to the
+# unit their output stores (enrich_with_hltb writes minutes).
+INDEX_UNIT = 'hours'
+UNIT_FACTORS = {'hours': 1.0, 'minutes': 60.0}
+
+def convert(hours, unit):
+    return hours * UNIT_FACTORS[unit]
+
+# "12", "12.5", "10-12" (lower bound kept), "12 Hours", "45 Mins"
+TIME_RE = (r'^\s*(?P<value>\d+(?:\.\d+)?)\s*(?:-\s*\d+(?:\.\d+)?)?\s*'
+           r'(?P<unit>h|hrs?|hours?|m|mins?|minutes?)?\s*$')
+
+# === PARSING ===
+def parse_hours(s):
+    """Bulk-parses a time column to hours; NaN when missing, unparseable or
+    not positive. Cells with a minute suffix are converted."""
+    parts = s.astype(str).str.extract(TIME_RE, flags=re.IGNORECASE)
+    values = pd.to_numeric(parts['value'], errors='coerce')
+    minutes = parts['unit'].str.lower().str.startswith('m').fillna(False).astype(bool)
+    values = values.where(~minutes, values / UNIT_FACTORS['minutes'])
+    return values.where(values > 0)
+
+def rows_frame(df):
+    """Raw dataset rows -> one row per entry with normalized title and hours."""
+    out = pd.DataFrame({'title': normalize_titles(df['name'])})
+    for t, col in TIME_COLUMNS.items():
+        out[t] = parse_hours(df[col]) if col in df.columns else np.nan
+    out['url'] = df['source_url'].fillna('').astype(str) if 'source_url' in df.columns else ''
+    return out[out['title'] != '']
+
+def read_dataset(path_or_buffer):
+    return pd.read_csv(path_or_buffer, dtype=str, keep_default_na=False, na_values=[''])
+
+# === SEGMENTS ===
+def write_strings(seg_dir, name, values):
+    encoded = [v.encode('utf-8') for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    np.save(os.path.join(seg_dir, f'{name}_offsets.npy'), offsets)
+    np.save(os.path.join(seg_dir, f'{name}.npy'), np.frombuffer(b''.join(encoded), dtype=np.uint8))
+
+def write_arrays(seg_dir, titles, sums, counts, urls):
+    keys = title_keys(titles)
+    order = np.argsort(keys, kind='stable')
+    os.makedirs(seg_dir, exist_ok=True)
+    np.save(os.path.join(seg_dir, 'keys.npy'), keys[order])
+    np.save(os.path.join(seg_dir, 'sums.npy'), np.asarray(sums, dtype=np.float64)[order])
+    np.save(os.path.join(seg_dir, 'counts.npy'), np.asarray(counts, dtype=np.uint32)[order])
+    write_strings(seg_dir, 'titles', [titles[i] for i in order])
+    write_strings(seg_dir, 'urls', [urls[i] for i in order])
+    return len(titles)
+
+def aggregate(frame, count_cols):
+    """Per-title totals; frame has title, url, the TIMES sums and count_cols."""
+    totals = frame.groupby('title', sort=False)[list(TIMES) + count_cols].sum(min_count=1).fillna(0)
+    # First non-empty URL per title
+    first_url = frame[frame['url'] != ''].drop_duplicates('title').set_index('title')['url']
+    urls = first_url.reindex(totals.index, fill_value='')
+    return totals.index.to_list(), totals[list(TIMES)], totals[count_cols], urls.to_list()
+
+def write_segment(seg_dir, rows):
+    """rows: rows_frame output. Writes the aggregated, key-sorted arrays."""
+    counted = rows.assign(**{f'n_{t}': rows[t].notna().astype(np.int64) for t in TIMES})
+    return write_arrays(seg_dir, *aggregate(counted, [f'n_{t}' for t in TIMES]))
+
+def decode_all(blob, offsets):
+    data = np.asarray(blob).tobytes()
+    offsets = np.asarray(offsets).tolist()
+    return [data[a:b].decode('utf-8') for a, b in zip(offsets[:-1], offsets[1:])]
+
+class Segment:
+    def __init__(self, seg_dir):
+        load = lambda name: np.load(os.path.join(seg_dir, name + '.npy'), mmap_mode='r')
+        self.keys = load('keys')
+        self.sums = load('sums')
+        self.counts = load('counts')
+        self.title_offsets, self.title_bytes = load('titles_offsets'), load('titles')
+        self.url_offsets, self.url_bytes = load('urls_offsets'), load('urls')
+
+    def __len__(self):
+        return len(self.keys)
+
+    def title(self, i):
+        return self.title_bytes[self.title_offsets[i]:self.title_offsets[i + 1]].tobytes().decode('utf-8')
+
+    def url(self, i):
+        return self.url_bytes[self.url_offsets[i]:self.url_offsets[i + 1]].tobytes().decode('utf-8')
+
+    def all_titles(self):
+        return decode_all(self.title_bytes, self.title_offsets)
+
+    def all_urls(self):
+        return decode_all(self.url_bytes, self.url_offsets)
+
+    def find(self, key, norm):
+        i = int(np.searchsorted(self.keys, np.uint64(key)))
+        while i < len(self.keys) and self.keys[i] == key:
+            if self.title(i) == norm:
+                return i
+            i += 1
+        return None
+
+# === INDEX ===
+class HltbIndex:
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self.manifest = read_manifest(index_dir)
+        self.segments = [Segment(os.path.join(index_dir, s)) for s in self.manifest['segments']]
+
+    def lookup(self, norm):
+        """Aggregated entry for an already-normalized title, or None."""
+        key = title_key(norm)
+        sums, counts, url = np.zeros(len(TIMES)), np.zeros(len(TIMES)), ''
+        found = False
+        for seg in self.segments:
+            i = seg.find(key, norm)
+            if i is None:
+                continue
+            found = True
+            sums += seg.sums[i]
+            counts += seg.counts[i]
+            url = url or seg.url(i)
+        if not found:
+            return None
+        entry = {t: (float(sums[j] / counts[j]) if counts[j] else None) for j, t in enumerate(TIMES)}
+        entry['url'] = url or None
+        return entry
+
+    def get(self, title):
+        return self.lookup(normalize_title(title))
+
+    def __contains__(self, title):
+        return self.get(title) is not None
+
+    def table(self, unit=INDEX_UNIT):
+        """Per-title means as one columnar frame (index: normalized title,
+        columns: main, extra, comp in `unit`, url)."""
+        parts = []
+        for seg in self.segments:
+            part = pd.DataFrame(np.asarray(seg.sums), columns=list(TIMES))
+            part[[f'n_{t}' for t in TIMES]] = np.asarray(seg.counts, dtype=np.int64)
+            part['title'] = seg.all_titles()
+            part['url'] = seg.all_urls()
+            parts.append(part)
+        if not parts:
+            return pd.DataFrame(columns=list(TIMES) + ['url'])
+        titles, sums, counts, urls = aggregate(pd.concat(parts, ignore_index=True), [f'n_{t}' for t in TIMES])
+        means = sums.to_numpy() / np.where(counts.to_numpy() > 0, counts.to_numpy(), np.nan)
+        table = pd.DataFrame(convert(means, unit), index=pd.Index(titles, name='title'), columns=list(TIMES))
+        table['url'] = urls
+        return table
+
+    def titles(self):
+        seen = set()
+        for seg in self.segments:
+            for i in range(len(seg)):
+                t = seg.title(i)
+                if t not in seen:
+                    seen.add(t)
+                    yield t
+
+def manifest_path(index_dir):
+    return os.path.join(index_dir, 'index.json')
+
+def read_manifest(index_dir):
+    try:
+        with open(manifest_path(index_dir), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # Title keys come from pandas' hash_array: rebuild when pandas changes
+    if manifest.get('version') != INDEX_VERSION or manifest.get('pandas') != pd.__version__:
+        return None
+    return manifest
+
+def write_manifest(index_dir, manifest):
+    tmp = manifest_path(index_dir) + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, manifest_path(index_dir))
+
+def next_segment_name(manifest):
+    n = manifest['next_segment']
+    manifest['next_segment'] = n + 1
+    return f'seg_{n:05d}'
+
+def prefix_hash(path, size):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        remaining = size
+        while remaining > 0:
+            block = f.read(min(1 << 20, remaining))
+            if not block:
+                break
+            h.update(block)
+            remaining -= len(block)
+    return h.hexdigest()
+
+def dataset_stat(path):
+    st = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+            'sha1': prefix_hash(path, st.st_size)}
+
+def build_index(dataset_path=HLTB_CSV_PATH, index_dir=None):
+    index_dir = index_dir or default_index_dir(dataset_path)
+    print(f"Building HLTB index from {dataset_path}...")
+    rows = rows_frame(read_dataset(dataset_path))
+    tmp_dir = index_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    manifest = {'version': INDEX_VERSION, 'pandas': pd.__version__, 'segments': [], 'next_segment': 0,
+                'dataset': dataset_stat(dataset_path)}
+    name = next_segment_name(manifest)
+    n = write_segment(os.path.join(tmp_dir, name), rows)
+    manifest['segments'].append(name)
+    write_manifest(tmp_dir, manifest)
+    shutil.rmtree(index_dir, ignore_errors=True)
+    os.replace(tmp_dir, index_dir)
+    print(f"Indexed {n} titles ({len(rows)} HLTB rows) in {index_dir}")
+    return index_dir
+
+def append_rows(index_dir, df):
+    """Adds raw dataset-format rows (name, main_story, ...) as a new segment."""
+    manifest = read_manifest(index_dir)
+    rows = rows_frame(df)
+    if manifest is None or len(rows) == 0:
+        return 0
+    name = next_segment_name(manifest)
+    n = write_segment(os.path.join(index_dir, name), rows)
+    manifest['segments'].append(name)
+    write_manifest(index_dir, manifest)
+    if len(manifest['segments']) > MAX_SEGMENTS:
+        compact(index_dir)
+    print(f"Appended {len(rows)} HLTB rows ({n} titles) to the index.")
+    return len(rows)
+
+def compact(index_dir):
+    manifest = read_manifest(index_dir)
+    segments = [Segment(os.path.join(index_dir, s)) for s in manifest['segments']]
+    parts = []
+    for seg in segments:
+        # Sums/counts are additive, so re-aggregating them is exact
+        part = pd.DataFrame(np.asarray(seg.sums), columns=list(TIMES))
+        part[[f'n_{t}' for t in TIMES]] = np.asarray(seg.counts, dtype=np.int64)
+        part['title'] = seg.all_titles()
+        part['url'] = seg.all_urls()
+        parts.append(part)
+    merged = pd.concat(parts, ignore_index=True)
+    name = next_segment_name(manifest)
+    write_arrays(os.path.join(index_dir, name), *aggregate(merged, [f'n_{t}' for t in TIMES]))
+    old = manifest['segments']
+    manifest['segments'] = [name]
+    write_manifest(index_dir, manifest)
+    for s in old:
+        shutil.rmtree(os.path.join(index_dir, s), ignore_errors=True)
+
+def refresh_index(dataset_path, index_dir):
+    """Brings the index up to date with the dataset file: nothing to do when
+    unchanged, tail rows appended when the file only grew, else a rebuild."""
+    manifest = read_manifest(index_dir)
+    if manifest is None:
+        return build_index(dataset_path, index_dir)
+    st = os.stat(dataset_path)
+    known = manifest['dataset']
+    if st.st_size == known['size'] and st.st_mtime_ns == known['mtime_ns']:
+        return index_dir
+    if st.st_size >= known['size'] and prefix_hash(dataset_path, known['size']) == known['sha1']:
+        with open(dataset_path, 'rb') as f:
+            header = f.readline()
+            f.seek(known['size'] - 1)
+            tail = f.read()
+        # Only whole rows were indexed if the old end was a line break
+        if not tail.startswith(b'\n'):
+            return build_index(dataset_path, index_dir)
+        tail = tail[1:]
+        if tail.strip():
+            append_rows(index_dir, read_dataset(io.BytesIO(header + tail)))
+            manifest = read_manifest(index_dir)
+        manifest['dataset'] = dataset_stat(dataset_path)
+        write_manifest(index_dir, manifest)
+        return index_dir
+    return build_index(dataset_path, index_dir)
+
+def load_hltb_table(dataset_path=HLTB_CSV_PATH, unit=INDEX_UNIT):
+    """Per-title mean times of the whole dataset as a DataFrame, in `unit`."""
+    return open_index(dataset_path).table(unit)
+
+def open_index(dataset_path=HLTB_CSV_PATH, index_dir=None):
+    index_dir = index_dir or default_index_dir(dataset_path)
+    if os.path.exists(dataset_path):
+        refresh_index(dataset_path, index_dir)
+    elif read_manifest(index_dir) is None:
+        raise FileNotFoundError(f"No HLTB dataset at {dataset_path} and no index in {index_dir}")
+    return HltbIndex(index_dir)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or update the HLTB title index")
+    parser.add_argument('--dataset', default=HLTB_CSV_PATH, help="HLTB dataset CSV")
+    parser.add_argument('--rebuild', action='store_true', help="Rebuild the index from scratch")
+    parser.add_argument('--append', default=None, help="CSV of extra HLTB rows (dataset format) to add")
+    args = parser.parse_args()
+    index_dir = default_index_dir(args.dataset)
+    if args.rebuild:
+        build_index(args.dataset, index_dir)
+    index = open_index(args.dataset, index_dir)
+    if args.append:
+        append_rows(index_dir, read_dataset(args.append))
+        index = HltbIndex(index_dir)
+    print(f"HLTB index: {sum(len(s) for s in index.segments)} entries in {len(index.segments)} segment(s)")
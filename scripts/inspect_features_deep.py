@@ -1,12 +1,15 @@
 
-import pandas as pd
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from pipe_csv import read_pipe_csv
 import numpy as np
 import ast
 from sklearn.preprocessing import MultiLabelBinarizer
 
 def inspect_features():
     csv_path = 'scripts/Data_science/merged_all_games.csv'
-    df = pd.read_csv(csv_path, sep='|', on_bad_lines='skip', low_memory=False)
+    df = read_pipe_csv(csv_path)
     
     # Simulating the pipeline features
     df['description'] = df['description'].fillna('').astype(str).str.lower()
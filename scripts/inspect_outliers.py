@@ -1,9 +1,12 @@
 
-import pandas as pd
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from pipe_csv import read_pipe_csv
 
 def inspect():
     csv_path = r'c:\Users\mathi\OneDrive\Documents\Code\Checkpoint\scripts\Data_science\merged_all_games.csv'
-    df = pd.read_csv(csv_path, sep='|', on_bad_lines='skip', low_memory=False)
+    df = read_pipe_csv(csv_path)
     
     targets = ['Zelda', 'Silksong', 'Death Howl', 'Expedition 33', 'Blue Prince']
     
@@ -0,0 +1,307 @@
+"""
+Shared reader for the pipe-delimited game CSVs (enriched_clean_dataset,
+merged_all_games, ...) used by the Data_science models, the report and the
+inspect scripts.
+
+read_pipe_csv(path) replaces pd.read_csv(path, sep='|', on_bad_lines='skip'):
+  - parsing runs on pyarrow's multithreaded CSV reader
+  - known embedded-delimiter patterns (e.g. "Xbox Series X|S") are repaired
+    while the file is streamed to the parser, instead of the row being lost
+  - rows that still have too many fields are not dropped silently: they are
+    written to .csv_quarantine/<file>.<run>.rejected next to the source and
+    counted, one file per run so earlier rejects are never overwritten;
+    short rows are kept with empty fields, as pd.read_csv keeps them
+  - declared columns (scripts/csv_schema.py) get their types, the frame comes
+    back with the dtypes pd.read_csv would give (nullable=True keeps pandas
+    nullable dtypes, categories=True dictionary-encodes category columns)
+
+Parsed frames go through the same cache as read_csv_cached.
+"""
+import csv
+import datetime
+import io
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+from csv_cache import read_cached
+from csv_schema import (BOOL_VALUES, COLUMN_TYPES, DATE_COLUMNS, TEXT, read_header, schema_for, coerce_column,
+                        parse_date_columns, add_date_parts, report_unparseable_dates)
+
+QUARANTINE_DIRNAME = '.csv_quarantine'
+BLOCK_SIZE = 1 << 22
+
+# (pattern, replacement) applied to every physical line before parsing
+REPAIRS = [
+    (re.compile(rb'X\|S'), b'X/S'),  # "Xbox Series X|S" in platform lists
+]
+
+class RepairedStream(io.RawIOBase):
+    """File-like view of path with REPAIRS applied block by block (cut at
+    the last newline, patterns never span lines), so the repair does not
+    need the whole file in memory."""
+
+    def __init__(self, path):
+        self.f = open(path, 'rb')
+        self.pending = b''
+        self.carry = b''
+        self.repaired = 0
+
+    def readable(self):
+        return True
+
+    def repair(self, data):
+        for pattern, replacement in REPAIRS:
+            data, n = pattern.subn(replacement, data)
+            self.repaired += n
+        return data
+
+    def readinto(self, b):
+        while len(self.pending) < len(b) and self.f is not None:
+            block = self.f.read(BLOCK_SIZE)
+            if not block:
+                self.pending += self.repair(self.carry)
+                self.carry = b''
+                self.f.close()
+                self.f = None
+                break
+            data = self.carry + block
+            cut = data.rfind(b'\n') + 1
+            self.pending += self.repair(data[:cut])
+            self.carry = data[cut:]
+        n = min(len(b), len(self.pending))
+        b[:n] = self.pending[:n]
+        self.pending = self.pending[n:]
+        return n
+
+    def close(self):
+        if self.f is not None:
+            self.f.close()
+        super().close()
+
+def open_repaired(path):
+    # Text stream for csv.reader users; the repair count is on .buffer.raw
+    return io.TextIOWrapper(io.BufferedReader(RepairedStream(path)), encoding='utf-8', newline='')
+
+class PipeRows:
+    """Streams the dict rows of a pipe CSV through open_repaired. Rows with
+    too many fields are appended to this run's quarantine file as they are
+    met instead of being yielded; short rows are padded with empty fields
+    (kept, as the enrichment scripts rewrite their own input).
+
+        with PipeRows(path) as rows:
+            for row in rows: ...
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.rejected = 0
+        self.quarantine = None
+        self.quarantine_path = None
+
+    def __enter__(self):
+        self.f = open_repaired(self.path)
+        self.reader = csv.DictReader(self.f, delimiter='|', restval='')
+        self.fieldnames = list(self.reader.fieldnames or [])
+        return self
+
+    def __iter__(self):
+        for row in self.reader:
+            if None in row:
+                self.reject(row)
+                continue
+            yield row
+
+    def reject(self, row):
+        if self.quarantine is None:
+            self.quarantine_path = quarantine_path(self.path)
+            os.makedirs(os.path.dirname(self.quarantine_path), exist_ok=True)
+            self.quarantine = open(self.quarantine_path, 'x', encoding='utf-8', newline='')
+            self.quarantine.write('|'.join(self.fieldnames) + '\n')
+        extra = row.pop(None, [])
+        self.quarantine.write('|'.join(list(row.values()) + extra) + '\n')
+        self.rejected += 1
+
+    @property
+    def repaired(self):
+        return self.f.buffer.raw.repaired
+
+    def __exit__(self, *exc):
+        self.f.close()
+        if self.quarantine is not None:
+            self.quarantine.close()
+            print(f"⚠️ {self.rejected} malformed rows in {os.path.basename(self.path)} quarantined to {self.quarantine_path}")
+        return False
+
+@contextmanager
+def atomic_write(path):
+    """Text file written to path.tmp and renamed over path only once the
+    block completes, so an interrupted run never leaves a half-written file
+    (path may also be the file being read)."""
+    tmp = f'{path}.tmp'
+    f = open(tmp, 'w', encoding='utf-8', newline='')
+    try:
+        yield f
+    except BaseException:
+        f.close()
+        os.remove(tmp)
+        raise
+    f.close()
+    os.replace(tmp, path)
+
+def quarantine_path(path):
+    """A new quarantine file for path, named after the time of the run."""
+    stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    return os.path.join(os.path.dirname(os.path.abspath(path)), QUARANTINE_DIRNAME,
+                        f"{os.path.basename(path)}.{stamp}.rejected")
+
+def arrow_type(dtype, categories):
+    return {
+        TEXT: pa.string(),
+        'Int64': pa.int64(),
+        'Int16': pa.int16(),
+        'Float64': pa.float64(),
+        'boolean': pa.bool_(),
+        'category': pa.dictionary(pa.int32(), pa.string()) if categories else pa.string(),
+    }[dtype]
+
+NULLABLE_TYPES = {} if not HAS_PYARROW else {
+    pa.int64(): pd.Int64Dtype(), pa.int16(): pd.Int16Dtype(),
+    pa.float64(): pd.Float64Dtype(), pa.bool_(): pd.BooleanDtype(),
+}
+
+def numpy_dtypes(df):
+    # What pd.read_csv would have inferred: ints with gaps become floats,
+    # booleans with gaps become objects
+    for col in df.columns:
+        dt = df[col].dtype
+        if isinstance(dt, pd.BooleanDtype):
+            df[col] = df[col].to_numpy(dtype=bool) if not df[col].hasnans else df[col].astype(object).where(df[col].notna(), np.nan)
+        elif pd.api.types.is_extension_array_dtype(dt) and pd.api.types.is_numeric_dtype(dt):
+            if pd.api.types.is_integer_dtype(dt) and not df[col].hasnans:
+                df[col] = df[col].to_numpy(dtype='int64')
+            else:
+                df[col] = df[col].to_numpy(dtype='float64', na_value=np.nan)
+    return df
+
+def arrow_read(source, column_types, on_invalid):
+    return pa_csv.read_csv(
+        source,
+        read_options=pa_csv.ReadOptions(use_threads=True, block_size=BLOCK_SIZE),
+        parse_options=pa_csv.ParseOptions(delimiter='|', newlines_in_values=True, invalid_row_handler=on_invalid),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=column_types,
+            strings_can_be_null=True,
+            true_values=[k for k, v in BOOL_VALUES.items() if v],
+            false_values=[k for k, v in BOOL_VALUES.items() if not v],
+        ),
+    )
+
+@contextmanager
+def padded_copy(path, n_fields, rejected):
+    """Binary temp file of the repaired rows of path, short rows padded with
+    empty fields; rows with more than n_fields fields go to rejected."""
+    with tempfile.TemporaryFile() as tmp:
+        out = io.TextIOWrapper(tmp, encoding='utf-8', newline='')
+        writer = csv.writer(out, delimiter='|', lineterminator='\n')
+        with open_repaired(path) as f:
+            for fields in csv.reader(f, delimiter='|'):
+                if not fields:
+                    continue
+                if len(fields) > n_fields:
+                    rejected.append('|'.join(fields))
+                    continue
+                writer.writerow(fields + [''] * (n_fields - len(fields)))
+        out.detach()
+        tmp.seek(0)
+        yield tmp
+
+def parse_pipe_csv(path, columns, schema, categories, strict):
+    """One arrow parse. strict=False reads declared columns as text (they are
+    coerced afterwards); returns (frame, rejected lines, repaired count)."""
+    rejected, short = [], []
+    def on_invalid(row):
+        (short if row.actual_columns < row.expected_columns else rejected).append(row.text)
+        return 'skip'
+
+    column_types = {c: pa.string() for c in columns if c in DATE_COLUMNS}
+    for col, dtype in schema.items():
+        column_types[col] = arrow_type(dtype, categories) if strict else pa.string()
+    stream = RepairedStream(path)
+    try:
+        table = arrow_read(io.BufferedReader(stream, buffer_size=BLOCK_SIZE), column_types, on_invalid)
+    finally:
+        stream.close()
+    if short:
+        # arrow can only skip a short row, pd.read_csv kept it with empty
+        # fields: parse again from a copy where csv.reader padded them
+        rejected, short = [], []
+        with padded_copy(path, len(columns), rejected) as f:
+            table = arrow_read(f, column_types, on_invalid)
+    return table.to_pandas(types_mapper=NULLABLE_TYPES.get), rejected, stream.repaired
+
+def write_quarantine(path, header, rejected):
+    if not rejected:
+        return
+    qpath = quarantine_path(path)
+    os.makedirs(os.path.dirname(qpath), exist_ok=True)
+    with open(qpath, 'w', encoding='utf-8', newline='') as f:
+        f.write('|'.join(header) + '\n')
+        for line in rejected:
+            f.write(line + '\n')
+    print(f"⚠️ {len(rejected)} malformed rows in {os.path.basename(path)} quarantined to {qpath}")
+
+def load_pipe_csv(path, categories=False):
+    columns = read_header(path, '|')
+    schema = schema_for(columns)
+    try:
+        df, rejected, repaired = parse_pipe_csv(path, columns, schema, categories, strict=True)
+    except pa.ArrowInvalid as e:
+        # A declared column holds values of another type: read it as text
+        # and coerce, bad cells become NA
+        print(f"   Schema mismatch in {os.path.basename(path)} ({e}), coercing...")
+        df, rejected, repaired = parse_pipe_csv(path, columns, schema, categories, strict=False)
+        for col, dtype in schema.items():
+            if col in df.columns:
+                if dtype == 'category' and not categories:
+                    continue
+                df[col] = coerce_column(df[col], dtype)
+    if repaired:
+        print(f"   Repaired {repaired} embedded delimiters in {os.path.basename(path)}")
+    write_quarantine(path, columns, rejected)
+    return df
+
+def read_pipe_csv(path, nullable=False, categories=False, parse_dates=False, date_parts=False):
+    """date_parts=True adds the <col>_year / <col>_day columns of every date
+    column (csv_schema.add_date_parts), computed once and cached with the frame."""
+    if not HAS_PYARROW:
+        # Same result without the multithreaded parser or the quarantine
+        df = pd.read_csv(path, sep='|', on_bad_lines='skip', low_memory=False)
+        if date_parts:
+            df = add_date_parts(df)
+    else:
+        options = {'reader': 'pipe_csv', 'short_rows': 'padded', 'repairs': [p.pattern.decode() for p, _ in REPAIRS],
+                   'schema': COLUMN_TYPES, 'categories': categories}
+        parse = lambda: load_pipe_csv(path, categories)
+        if date_parts:
+            options['date_parts'] = sorted(DATE_COLUMNS.items())
+            parse = lambda: add_date_parts(load_pipe_csv(path, categories))
+        df = read_cached(path, parse, options)
+    if date_parts:
+        report_unparseable_dates(path, df)
+    if not nullable:
+        df = numpy_dtypes(df)
+    if parse_dates:
+        df = parse_date_columns(df)
+    return df
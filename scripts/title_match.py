@@ -0,0 +1,239 @@
+"""
+Fuzzy title matching against the HLTB index (scripts/hltb_index.py).
+
+Every title goes through three methods, the first hit wins:
+  - 'exact'    normalized title is in the index
+  - 'variant'  same title once edition words, roman numerals and a leading
+               "the" are canonicalized ("The Witcher III GOTY Edition" ->
+               "witcher 3"), when exactly one HLTB title has that canonical
+               form: "mega man x" and "mega man 10" share one, so titles
+               canonicalizing to it only match exactly
+  - 'trigram'  best cosine similarity between TF-IDF character trigram
+               vectors, accepted at MATCH_THRESHOLD or above when both
+               titles carry the same numbers (sequels, years)
+
+Candidates come from a sparse title x trigram matrix (the inverted index):
+queries are scored in batches with one sparse product, never pairwise. The
+matrix is cached in the index folder and rebuilt when the index changes.
+
+    matcher = load_matcher(index)
+    for m in matcher.match(titles): ...   # Match(entry, title, method, score)
+"""
+import csv
+import hashlib
+import itertools
+import json
+import os
+import re
+from collections import namedtuple
+
+import numpy as np
+import scipy.sparse as sp
+
+from hltb_index import normalize_title
+
+MATCH_THRESHOLD = 0.86
+MIN_TRIGRAM_LEN = 4  # shorter titles only match exactly
+BATCH_SIZE = 2000
+CANDIDATE_MAX_DF = 0.02
+
+Match = namedtuple('Match', ['entry', 'title', 'method', 'score'])
+NO_MATCH = Match(None, None, None, 0.0)
+
+ROMAN = {'ii': '2', 'iii': '3', 'iv': '4', 'v': '5', 'vi': '6', 'vii': '7',
+         'viii': '8', 'ix': '9', 'x': '10', 'xi': '11', 'xii': '12', 'xiii': '13'}
+EDITION_RE = re.compile(
+    r'\b(?:game of the year|goty|definitive|complete|deluxe|ultimate|enhanced|'
+    r'special|anniversary|gold|premium|standard|collectors|directors cut)'
+    r'(?: edition)?\b|\bedition\b')
+
+def canonical_title(norm):
+    # norm is already normalize_title() output ("&" is gone, so "and" goes too)
+    words = [w for w in EDITION_RE.sub(' ', norm).split() if w != 'and']
+    if words[:1] == ['the'] and len(words) > 1:
+        words = words[1:]
+    return ' '.join(ROMAN.get(w, w) for w in words)
+
+def numbers(canon):
+    return {w for w in canon.split() if w.isdigit()}
+
+def trigrams(text):
+    padded = f'  {text} '
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+class TitleMatcher:
+    def __init__(self, index, titles, vocab, matrix, idf):
+        self.index = index
+        self.titles = titles
+        self.vocab = vocab
+        self.matrix = matrix        # titles x trigrams, rows L2-normalized
+        # Inverted index used to generate candidates: trigrams shared by
+        # more than CANDIDATE_MAX_DF of titles only add noise to the product
+        df = np.diff(matrix.tocsc().indptr)
+        keep = (df <= max(1, CANDIDATE_MAX_DF * matrix.shape[0])).astype(float)
+        self.candidates_t = (matrix @ sp.diags(keep)).T.tocsr()
+        self.candidates_t.eliminate_zeros()
+        self.idf = idf
+        # Variant keys: empty canonicals (titles made of edition words only)
+        # are not used, canonicals shared by distinct titles are ambiguous
+        # (neither the variant nor the trigram step can tell them apart)
+        owners = {}
+        for t in titles:
+            canon = canonical_title(t)
+            if canon:
+                owners.setdefault(canon, set()).add(t)
+        self.canonical = {canon: next(iter(ts)) for canon, ts in owners.items() if len(ts) == 1}
+        self.ambiguous = {canon for canon, ts in owners.items() if len(ts) > 1}
+
+    def vectorize(self, texts):
+        rows, cols = [], []
+        unknown = np.zeros(len(texts))
+        for r, text in enumerate(texts):
+            for g in set(trigrams(text)):
+                c = self.vocab.get(g)
+                if c is None:
+                    unknown[r] += 1
+                else:
+                    rows.append(r)
+                    cols.append(c)
+        q = sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(texts), len(self.vocab)))
+        q = q.multiply(self.idf).tocsr()
+        # Trigrams no HLTB title has still count against the match, at the
+        # weight of the rarest known trigram
+        norms = np.sqrt(q.multiply(q).sum(axis=1).A1 + unknown * self.idf.max() ** 2)
+        norms[norms == 0] = 1.0
+        return sp.diags(1.0 / norms) @ q
+
+    def best_matches(self, texts):
+        """(title index, cosine) of the best trigram candidate per text.
+        Candidates come from the rarer trigrams only (CANDIDATE_MAX_DF), the
+        winner is then rescored on the full vectors."""
+        best_idx = np.full(len(texts), -1)
+        best_score = np.zeros(len(texts))
+        for start in range(0, len(texts), BATCH_SIZE):
+            q = self.vectorize(texts[start:start + BATCH_SIZE])
+            scores = (q @ self.candidates_t).tocsr()
+            top, arg = row_argmax(scores)
+            has = np.flatnonzero(arg >= 0)
+            if len(has) == 0:
+                continue
+            exact = q[has].multiply(self.matrix[arg[has]]).sum(axis=1).A1
+            best_idx[start + has] = arg[has]
+            best_score[start + has] = exact
+        return best_idx, best_score
+
+    def match(self, titles, threshold=MATCH_THRESHOLD):
+        results = [NO_MATCH] * len(titles)
+        fuzzy = []
+        for i, title in enumerate(titles):
+            norm = normalize_title(title)
+            if not norm:
+                continue
+            entry = self.index.lookup(norm)
+            if entry is not None:
+                results[i] = Match(entry, norm, 'exact', 1.0)
+                continue
+            canon = canonical_title(norm)
+            if canon in self.canonical:
+                hit = self.canonical[canon]
+                results[i] = Match(self.index.lookup(hit), hit, 'variant', 1.0)
+            elif canon not in self.ambiguous and len(canon) >= MIN_TRIGRAM_LEN:
+                fuzzy.append((i, canon))
+
+        if fuzzy:
+            idx, score = self.best_matches([c for _, c in fuzzy])
+            for (i, canon), j, s in zip(fuzzy, idx, score):
+                if j < 0 or s < threshold:
+                    continue
+                hit_canon = canonical_title(self.titles[j])
+                # Sequel / year numbers must agree ("portal" is not "portal 2")
+                if hit_canon not in self.ambiguous and numbers(canon) == numbers(hit_canon):
+                    hit = self.titles[j]
+                    results[i] = Match(self.index.lookup(hit), hit, 'trigram', round(float(s), 4))
+        return results
+
+def row_argmax(m):
+    """Per-row max and column of a CSR matrix (-1 for empty rows), without
+    the index sort scipy's argmax does."""
+    n = m.shape[0]
+    top, arg = np.zeros(n), np.full(n, -1)
+    counts = np.diff(m.indptr)
+    rows = np.flatnonzero(counts)
+    if len(rows) == 0:
+        return top, arg
+    top[rows] = np.maximum.reduceat(m.data, m.indptr[rows])
+    row_of = np.repeat(np.arange(n), counts)
+    hits = np.flatnonzero(m.data == top[row_of])
+    first_rows, first = np.unique(row_of[hits], return_index=True)
+    arg[first_rows] = m.indices[hits[first]]
+    return top, arg
+
+# === BUILD / CACHE ===
+def build_matrix(titles):
+    vocab, rows, cols = {}, [], []
+    for r, t in enumerate(titles):
+        for g in set(trigrams(canonical_title(t))):
+            rows.append(r)
+            cols.append(vocab.setdefault(g, len(vocab)))
+    m = sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(titles), len(vocab)))
+    df = np.bincount(cols, minlength=len(vocab))
+    idf = np.log((1 + len(titles)) / (1 + df)) + 1.0
+    m = m.multiply(idf).tocsr()
+    norms = np.sqrt(m.multiply(m).sum(axis=1)).A1
+    norms[norms == 0] = 1.0
+    return vocab, (sp.diags(1.0 / norms) @ m).tocsr(), idf
+
+def cache_key(index):
+    return hashlib.sha1(json.dumps(index.manifest['segments']).encode('utf-8')).hexdigest()[:16]
+
+def load_matcher(index):
+    """TitleMatcher over every title of an HltbIndex, cached next to it."""
+    key = cache_key(index)
+    matrix_path = os.path.join(index.index_dir, f'matcher_{key}.npz')
+    meta_path = os.path.join(index.index_dir, f'matcher_{key}.json')
+    titles = list(index.titles())
+    if os.path.exists(matrix_path) and os.path.exists(meta_path):
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        matrix = sp.load_npz(matrix_path).tocsr()
+        return TitleMatcher(index, titles, meta['vocab'], matrix, np.asarray(meta['idf']))
+
+    vocab, matrix, idf = build_matrix(titles)
+    for name in os.listdir(index.index_dir):
+        if name.startswith('matcher_'):
+            os.remove(os.path.join(index.index_dir, name))
+    sp.save_npz(matrix_path, matrix)
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump({'vocab': vocab, 'idf': idf.tolist()}, f)
+    return TitleMatcher(index, titles, vocab, matrix, idf)
+
+def match_rows(matcher, rows, title_of, batch_size=BATCH_SIZE):
+    """Yields (row, Match) for a stream of rows, scoring one batch of titles
+    at a time so memory stays bounded by batch_size."""
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return
+        yield from zip(batch, matcher.match([title_of(r) for r in batch]))
+
+def match_report_path(output_path):
+    return os.path.splitext(str(output_path))[0] + '_hltb_matches.csv'
+
+class MatchReport:
+    """Incremental report, one row per matched game: which HLTB title it got,
+    how and how sure. Keeps per-method counts for the summary line."""
+
+    def __init__(self, f):
+        self.writer = csv.writer(f, delimiter='|')
+        self.writer.writerow(['id', 'title', 'hltbTitle', 'method', 'score'])
+        self.counts = {}
+
+    def add(self, game_id, title, m):
+        method = m.method or 'none'
+        self.counts[method] = self.counts.get(method, 0) + 1
+        if m.method:
+            self.writer.writerow([game_id, title, m.title, m.method, m.score])
+
+    def summary(self):
+        return ', '.join(f"{k}: {v}" for k, v in sorted(self.counts.items()))
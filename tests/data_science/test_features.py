@@ -0,0 +1,44 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'scripts', 'Data_science'))
+from feature_registry import META_FLAGS, all_meta
+from features import GroupLookup, franchise_momentum, keyword_flags, studio_average
+
+def catalog():
+    return pd.DataFrame({
+        'id': ['1', '2', '3', '4', '5'],
+        'studio': ['A', 'A', 'A', 'B', 'B'],
+        'franchise': ['F', 'F', 'F', 'G', 'G'],
+        'year_rel': [2010.0, 2012.0, 2015.0, 2011.0, 2013.0],
+        'hltbMain': [10.0, 20.0, np.nan, 5.0, 0.0],
+    })
+
+def test_lookup_matches_batch_features():
+    df = catalog()
+    lookup = GroupLookup(df)
+    np.testing.assert_allclose(lookup.studio_average(df), studio_average(df))
+    np.testing.assert_allclose(lookup.franchise_momentum(df), franchise_momentum(df))
+
+def test_lookup_gives_missing_to_games_without_time():
+    lookup = GroupLookup(catalog())
+    new = pd.DataFrame({'id': ['9', '10'], 'studio': ['A', 'A'], 'franchise': ['F', 'F'],
+                        'year_rel': [2014.0, 2014.0], 'hltbMain': [np.nan, 12.0]})
+    assert lookup.studio_average(new).tolist() == [-1, 15.0]
+    assert lookup.franchise_momentum(new).iloc[0] == -1
+    assert lookup.franchise_momentum(new).iloc[1] > 0
+
+def test_meta_flags_with_a_missing_text_column():
+    df = pd.DataFrame({'genres': pd.Series(['Role-playing (RPG)', None], dtype='str'),
+                       'keywords': pd.Series([None, 'anime'], dtype='str'),
+                       'themes': pd.Series([None, 'Fantasy'], dtype='str')})
+    flags = keyword_flags(all_meta(df), META_FLAGS)
+    assert flags['is_rpg'].tolist() == [1, 0]
+    assert flags['KW_JRPG'].tolist() == [0, 1]
+
+def test_missing_text_has_no_flag():
+    flags = keyword_flags(pd.Series([np.nan, None, 'nan']), {'x': ['nan']})
+    assert flags['x'].tolist() == [0, 0, 1]
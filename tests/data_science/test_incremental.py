@@ -0,0 +1,42 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+from sklearn.ensemble import HistGradientBoostingRegressor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'scripts', 'Data_science'))
+import incremental
+from incremental import FrozenBinsRegressor, plain_regressor, warm_regressor
+
+def test_warm_fit_on_subset_of_categories_keeps_old_trees():
+    rng = np.random.default_rng(0)
+    codes = rng.integers(0, 5, 2000).astype(float)
+    X = np.c_[codes, rng.normal(size=len(codes))]
+    y = 10 * codes + rng.normal(size=len(codes))
+    model = HistGradientBoostingRegressor(categorical_features=[0], max_iter=50, random_state=0).fit(X, y)
+    probe = np.c_[np.arange(5.0), np.zeros(5)]
+    before = model.predict(probe)
+    n_iter = model.n_iter_
+
+    # New data lacks category 1: the old trees must still see 2 as 2
+    keep = codes != 1
+    warm, extra = warm_regressor(model, n_iter)
+    assert isinstance(warm, FrozenBinsRegressor)
+    warm.fit(X[keep], y[keep])
+
+    assert warm.n_iter_ == n_iter + extra
+    old_trees = list(warm.staged_predict(probe))[n_iter - 1]
+    np.testing.assert_allclose(old_trees, before)
+    # The regressor that was warm-started is left as it was
+    np.testing.assert_allclose(model.predict(probe), before)
+
+    saved = plain_regressor(warm)
+    assert type(saved) is HistGradientBoostingRegressor
+    np.testing.assert_allclose(saved.predict(probe), warm.predict(probe))
+
+def test_warm_start_refused_on_unchecked_sklearn(monkeypatch):
+    model = HistGradientBoostingRegressor(max_iter=5).fit(np.arange(20.0)[:, None], np.arange(20.0))
+    monkeypatch.setattr(incremental.sklearn, '__version__', '9.0.0')
+    with pytest.raises(RuntimeError):
+        warm_regressor(model, 5)
@@ -0,0 +1,67 @@
+import json
+import os
+import sys
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'scripts', 'Data_science'))
+from serve import LruCache, make_handler
+
+class StubPredictor:
+    meta = {'name': 'v0', 'version': 1}
+
+    def __init__(self, error=None):
+        self.cache = LruCache()
+        self.error = error
+        self.calls = 0
+
+    def predict(self, games):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return [{'id': g.get('id'), 'predicted_main': 1.0} for g in games]
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(predictor):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(predictor))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f'http://127.0.0.1:{server.server_address[1]}/predict'
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode('utf-8'), method='POST')
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+def test_malformed_payload_is_a_400(serve):
+    predictor = StubPredictor()
+    status, body = post(serve(predictor), {'releaseDate': 5})
+    assert status == 400
+    assert 'releaseDate' in body['error']
+    assert predictor.calls == 0
+
+def test_prediction_failure_is_a_500(serve):
+    predictor = StubPredictor(error=AttributeError('Can only use .str accessor with string values'))
+    status, body = post(serve(predictor), {'title': 'Outer Wilds', 'releaseDate': '2019-05-28'})
+    assert status == 500
+    assert 'AttributeError' in body['error']
+
+def test_valid_payload(serve):
+    status, body = post(serve(StubPredictor()), {'games': [{'id': 1942, 'steamReviewCount': 10, 'isDlc': False}]})
+    assert status == 200
+    assert body['predictions'] == [{'id': 1942, 'predicted_main': 1.0}]